@@ -0,0 +1,59 @@
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from posts.utilites import CURSOR_KEYS, decode_cursor, encode_cursor, seek
+
+CONTENT_TYPE = 'application/json; charset=utf-8'
+
+
+def dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def stream_rows(rows, serialize, page_size, keys):
+    """Пишет страницу построчно, пока строки читаются из курсора БД.
+
+    Лишняя строка сверх page_size только сообщает, что есть следующая
+    страница; ссылка на неё выводится в конце ответа.
+    """
+    yield '{"results": ['
+    last = None
+    for number, row in enumerate(rows):
+        if number == page_size:
+            yield '], "next": ' + dumps(encode_cursor(last, keys)) + '}'
+            return
+        if number:
+            yield ', '
+        yield dumps(serialize(row))
+        last = row
+    yield '], "next": null}'
+
+
+def stream_page(request, queryset, serialize, keys=CURSOR_KEYS,
+                page_size=settings.PAGE_SIZE):
+    """Потоковый ответ со страницей queryset.values() после курсора ?after=.
+
+    Строки не превращаются в модели и не собираются в список: каждая
+    сериализуется сразу после чтения из базы.
+    """
+    after = decode_cursor(request.GET.get('after'))
+    rows = seek(queryset, after, keys)[:page_size + 1].iterator()
+    return StreamingHttpResponse(
+        stream_rows(rows, serialize, page_size, keys),
+        content_type=CONTENT_TYPE,
+    )
+
+
+def stream_list(rows, serialize):
+    """Потоковый ответ с коротким справочником без пагинации."""
+    def generate():
+        yield '{"results": ['
+        for number, row in enumerate(rows):
+            if number:
+                yield ', '
+            yield dumps(serialize(row))
+        yield ']}'
+    return StreamingHttpResponse(generate(), content_type=CONTENT_TYPE)
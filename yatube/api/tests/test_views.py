@@ -0,0 +1,177 @@
+import json
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}'
+            )
+            for i in range(settings.PAGE_SIZE + 3)
+        ]
+        cls.post = cls.posts[-1]
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.user, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self) -> None:
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get_json(self, url, client=None, **params):
+        response = (client or self.guest_client).get(url, params)
+        if response.streaming:
+            content = b''.join(response.streaming_content)
+        else:
+            content = response.content
+        self.assertEqual(response['Content-Type'].split(';')[0],
+                         'application/json')
+        return response, json.loads(content.decode())
+
+    def test_feeds_page_with_cursors(self):
+        newest = [post.pk for post in reversed(self.posts)]
+        for url in (
+            reverse('api:post_list'),
+            reverse('api:group_posts', args=[self.group.slug]),
+            reverse('api:profile_posts', args=[self.author.username]),
+        ):
+            with self.subTest(url=url):
+                response, data = self.get_json(url)
+                self.assertTrue(response.streaming)
+                self.assertEqual(
+                    [post['id'] for post in data['results']],
+                    newest[:settings.PAGE_SIZE],
+                )
+                _, data = self.get_json(url, after=data['next'])
+                self.assertEqual(
+                    [post['id'] for post in data['results']],
+                    newest[settings.PAGE_SIZE:],
+                )
+                self.assertIsNone(data['next'])
+
+    def test_post_fields(self):
+        _, data = self.get_json(
+            reverse('api:post_detail', args=[self.post.pk])
+        )
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(data['author'], self.author.username)
+        self.assertEqual(data['group'], self.group.slug)
+        self.assertEqual(data['comments_count'], 1)
+        self.assertIsNone(data['image'])
+
+    def test_comments(self):
+        _, data = self.get_json(
+            reverse('api:comment_list', args=[self.post.pk])
+        )
+        self.assertEqual(data['results'], [{
+            'id': self.comment.pk,
+            'text': self.comment.text,
+            'created': data['results'][0]['created'],
+            'author': self.user.username,
+        }])
+
+    def test_groups_and_profile(self):
+        _, data = self.get_json(reverse('api:group_list'))
+        self.assertEqual(data['results'], [{
+            'title': self.group.title,
+            'slug': self.group.slug,
+            'description': self.group.description,
+        }])
+        _, data = self.get_json(
+            reverse('api:profile', args=[self.author.username]),
+            client=self.authorized_client,
+        )
+        self.assertEqual(data, {
+            'username': 'author',
+            'full_name': 'Лев Толстой',
+            'posts_count': len(self.posts),
+            'followers_count': 1,
+            'following': True,
+        })
+
+    def test_missing_objects(self):
+        for url in (
+            reverse('api:post_detail', args=[0]),
+            reverse('api:comment_list', args=[0]),
+            reverse('api:group_detail', args=['missing']),
+            reverse('api:group_posts', args=['missing']),
+            reverse('api:profile', args=['missing']),
+            reverse('api:profile_posts', args=['missing']),
+        ):
+            with self.subTest(url=url):
+                response, data = self.get_json(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertIn('detail', data)
+
+    def test_read_only(self):
+        response = self.authorized_client.post(reverse('api:post_list'))
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED
+        )
+
+    def test_feed_is_a_single_query(self):
+        response = self.guest_client.get(reverse('api:post_list'))
+        with CaptureQueriesContext(connection) as queries:
+            b''.join(response.streaming_content)
+        self.assertEqual(len(queries), 1)
+
+
+class ExportViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+        Post.objects.create(author=cls.user, text='Пост')
+
+    def test_only_staff_can_export(self):
+        url = reverse('api:export', args=['posts'])
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.FORBIDDEN
+        )
+        self.client.force_login(self.user)
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.FORBIDDEN
+        )
+
+    def test_streams_table(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            reverse('api:export', args=['posts']), {'format': 'csv'}
+        )
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('posts.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content.splitlines()[1].split(',')[1], 'user')
+        self.assertEqual(
+            self.client.get(
+                reverse('api:export', args=['users'])
+            ).status_code,
+            HTTPStatus.NOT_FOUND,
+        )
@@ -0,0 +1,157 @@
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from posts import export
+from posts.counters import get_stats
+from posts.follows import is_following
+from posts.models import Comment, Group, Post
+from posts.utilites import COMMENT_KEYS
+
+from .streaming import stream_list, stream_page
+
+User = get_user_model()
+
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'image', 'comments_count',
+    'author__username', 'group__slug',
+)
+COMMENT_FIELDS = ('id', 'text', 'created', 'author__username')
+GROUP_FIELDS = ('title', 'slug', 'description')
+
+image_storage = Post._meta.get_field('image').storage
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def not_found():
+    return json_response({'detail': 'Не найдено.'}, status=404)
+
+
+def serialize_post(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'author': row['author__username'],
+        'group': row['group__slug'],
+        'image': image_storage.url(row['image']) if row['image'] else None,
+        'comments_count': row['comments_count'],
+    }
+
+
+def serialize_comment(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created': row['created'],
+        'author': row['author__username'],
+    }
+
+
+def feed_rows():
+    return Post.objects.for_feed().values(*POST_FIELDS)
+
+
+@require_GET
+def post_list(request):
+    return stream_page(request, feed_rows(), serialize_post)
+
+
+@require_GET
+def post_detail(request, post_id):
+    row = feed_rows().filter(pk=post_id).first()
+    if row is None:
+        return not_found()
+    return json_response(serialize_post(row))
+
+
+@require_GET
+def comment_list(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return not_found()
+    comments = Comment.objects.filter(post_id=post_id).values(
+        *COMMENT_FIELDS
+    )
+    return stream_page(request, comments, serialize_comment, COMMENT_KEYS)
+
+
+@require_GET
+def group_list(request):
+    groups = Group.objects.order_by('title').values(*GROUP_FIELDS)
+    return stream_list(groups.iterator(), dict)
+
+
+@require_GET
+def group_detail(request, slug):
+    row = Group.objects.filter(slug=slug).values(*GROUP_FIELDS).first()
+    if row is None:
+        return not_found()
+    return json_response(row)
+
+
+@require_GET
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return not_found()
+    return stream_page(
+        request, feed_rows().filter(group_id=group_id), serialize_post
+    )
+
+
+@require_GET
+def profile(request, username):
+    author = User.objects.select_related('stats').filter(
+        username=username
+    ).first()
+    if author is None:
+        return not_found()
+    stats = get_stats(author)
+    following = bool(is_following(request.user, [author]))
+    return json_response({
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following': following,
+    })
+
+
+@require_GET
+def profile_posts(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return not_found()
+    return stream_page(
+        request, feed_rows().filter(author_id=author_id), serialize_post
+    )
+
+
+@require_GET
+def export_table(request, table):
+    """Потоковая выгрузка таблицы для персонала: ?format=csv, ?gzip=1."""
+    if not request.user.is_staff:
+        return json_response({'detail': 'Доступ запрещён.'}, status=403)
+    fmt = request.GET.get('format', 'ndjson')
+    if table not in export.TABLES or fmt not in export.FORMATS:
+        return not_found()
+    compress = request.GET.get('gzip') == '1'
+    response = StreamingHttpResponse(
+        export.stream(table, fmt, compress),
+        content_type=(
+            'application/gzip' if compress else export.FORMATS[fmt]
+        ),
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{export.filename(table, fmt, compress)}"'
+    )
+    return response
@@ -0,0 +1,269 @@
+import math
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files import locks
+
+LOCK_SUFFIX = ':lock'
+INCR_SUFFIX = ':incr'
+MAX_PENDING = 1000
+LOCK_FILES = 64
+
+
+class LockingFileBasedCache(FileBasedCache):
+    """Файловый кэш, у которого add() и incr() атомарны между процессами.
+
+    Обе операции идут под блокировкой одного из LOCK_FILES файлов,
+    выбранного по ключу. Блокировку снимает ОС, даже если процесс упал.
+    """
+
+    @contextmanager
+    def _mutex(self, key, version):
+        name = os.path.basename(self._key_to_file(key, version))
+        stripe = int(name[:8], 16) % LOCK_FILES
+        self._createdir()
+        path = os.path.join(self._dir, f'{stripe}.lock')
+        with open(path, 'ab') as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._mutex(key, version):
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._mutex(key, version):
+            return super().incr(key, delta, version)
+
+
+class TwoTierCache(BaseCache):
+    """Кэш из локального L1 в памяти процесса и общего для всех воркеров L2.
+
+    LOCATION — имя другого кэша из settings.CACHES, который служит L2.
+    Значение хранится вместе со сроком свежести и временем, за которое
+    его посчитали. После срока оно ещё STALE_TIMEOUT секунд лежит в L2:
+
+    * пересчитывать его идёт только тот, кто взял блокировку ключа,
+      остальные в это время получают устаревшее значение;
+    * незадолго до срока ключ с вероятностью, растущей к концу срока
+      и со временем расчёта, отдаётся как промах одному из читателей
+      (вероятностное раннее обновление), и лавины на истечении нет.
+
+    get_or_set() вдобавок ждёт чужого расчёта, если значения нет вовсе.
+    get() на таком промахе ждёт только для ключей с префиксами из
+    LOCK_ON_MISS: не всякий читатель потом пишет, а фрагменты шаблонов
+    тег {% cache %} записывает после каждого промаха.
+    L1 хранит записи не дольше L1_TIMEOUT секунд: на столько другие
+    процессы могут отставать от записей и удалений. Блокировки держатся
+    на add() кэша L2, поэтому он должен быть атомарным между процессами,
+    как у memcached или LockingFileBasedCache.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = location
+        self._l1_timeout = options.get('L1_TIMEOUT', 1)
+        self._stale_timeout = options.get('STALE_TIMEOUT', 60)
+        self._lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self._poll_interval = options.get('POLL_INTERVAL', 0.05)
+        self._beta = options.get('BETA', 1.0)
+        self._lock_on_miss = tuple(options.get('LOCK_ON_MISS', ()))
+        self._l1 = LocMemCache(f'two-tier-{location}', {
+            'TIMEOUT': self._l1_timeout,
+            'OPTIONS': {'MAX_ENTRIES': options.get('L1_MAX_ENTRIES', 1000)},
+        })
+        self._pending = {}
+        self._locks = set()
+
+    @property
+    def _l2(self):
+        return caches[self._l2_alias]
+
+    def _read(self, key):
+        entry = self._l1.get(key)
+        if entry is None:
+            entry = self._l2.get(key)
+            if entry is not None:
+                self._l1.set(key, entry)
+        return entry
+
+    def _start(self, key):
+        """Запоминает начало расчёта, чтобы знать, сколько он длится."""
+        if len(self._pending) >= MAX_PENDING:
+            self._pending.clear()
+            self._locks.clear()
+        self._pending[key] = time.time()
+
+    def _lock(self, key):
+        if self._l2.add(key + LOCK_SUFFIX, True, self._lock_timeout):
+            self._start(key)
+            self._locks.add(key)
+            return True
+        return False
+
+    def _unlock(self, key):
+        if key in self._locks:
+            self._locks.discard(key)
+            self._l2.delete(key + LOCK_SUFFIX)
+
+    def _entry(self, key, value, timeout):
+        """Запись для хранения и срок её жизни в L2."""
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        now = time.time()
+        started = self._pending.pop(key, None)
+        delta = now - started if started is not None else 0
+        if timeout is None:
+            return (value, None, delta), None
+        return (value, now + timeout, delta), timeout + self._stale_timeout
+
+    def _is_fresh(self, expires, delta):
+        if expires is None:
+            return True
+        # XFetch: -log(random) > 0 сдвигает момент обновления раньше срока.
+        early = -delta * self._beta * math.log(1 - random.random())
+        return time.time() + early < expires
+
+    def _needs_refresh(self, key, entry):
+        """Свежее ли значение, а если нет — кому его пересчитывать.
+
+        Устаревшее значение пересчитывает только взявший блокировку,
+        остальным оно отдаётся как есть.
+        """
+        _, expires, delta = entry
+        return not self._is_fresh(expires, delta) and self._lock(key)
+
+    def get(self, key, default=None, version=None):
+        full_key = self.make_key(key, version=version)
+        self.validate_key(full_key)
+        entry = self._read(full_key)
+        if entry is None:
+            if not key.startswith(self._lock_on_miss):
+                self._start(full_key)
+                return default
+            if self._lock(full_key):
+                return default
+            entry = self._wait(full_key)
+            if entry is None:
+                return default
+        elif self._needs_refresh(full_key, entry):
+            return default
+        return entry[0]
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        full_key = self.make_key(key, version=version)
+        self.validate_key(full_key)
+        entry = self._read(full_key)
+        if entry is not None:
+            if not self._needs_refresh(full_key, entry):
+                return entry[0]
+        elif not self._lock(full_key):
+            entry = self._wait(full_key)
+            if entry is not None:
+                return entry[0]
+        if callable(default):
+            default = default()
+        if default is not None:
+            self.set(key, default, timeout, version)
+        return default
+
+    def _wait(self, key):
+        """Ждёт, пока значение посчитает процесс, взявший блокировку."""
+        deadline = time.time() + self._lock_timeout
+        while time.time() < deadline:
+            time.sleep(self._poll_interval)
+            entry = self._l2.get(key)
+            if entry is not None:
+                self._l1.set(key, entry)
+                return entry
+            if not self._l2.has_key(key + LOCK_SUFFIX):
+                break
+        self._start(key)
+        return None
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._read(key) is not None
+
+    def incr(self, key, delta=1, version=None):
+        """Сдвигает число, не трогая срок свежести и не беря блокировку."""
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        while not self._l2.add(key + INCR_SUFFIX, True, self._lock_timeout):
+            time.sleep(self._poll_interval)
+        try:
+            entry = self._l2.get(key)
+            if entry is None:
+                raise ValueError(f"Key '{key}' not found")
+            value, expires, delta_time = entry
+            entry = (value + delta, expires, delta_time)
+            if expires is None:
+                l2_timeout = None
+            else:
+                l2_timeout = max(expires - time.time(), 0)
+                l2_timeout += self._stale_timeout
+            self._l2.set(key, entry, l2_timeout)
+            self._l1.set(key, entry)
+            return entry[0]
+        finally:
+            self._l2.delete(key + INCR_SUFFIX)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        entry, l2_timeout = self._entry(key, value, timeout)
+        if not self._l2.add(key, entry, l2_timeout):
+            return False
+        self._l1.set(key, entry)
+        self._unlock(key)
+        return True
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        if timeout is not None and timeout != DEFAULT_TIMEOUT and timeout <= 0:
+            self._delete(key)
+            return
+        entry, l2_timeout = self._entry(key, value, timeout)
+        self._l2.set(key, entry, l2_timeout)
+        self._l1.set(key, entry)
+        self._unlock(key)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        entry = self._read(key)
+        if entry is None:
+            return False
+        self._pending.pop(key, None)
+        entry, l2_timeout = self._entry(key, entry[0], timeout)
+        self._l2.set(key, entry, l2_timeout)
+        self._l1.set(key, entry)
+        return True
+
+    def _delete(self, key):
+        self._pending.pop(key, None)
+        self._unlock(key)
+        self._l1.delete(key)
+        self._l2.delete(key)
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._delete(key)
+
+    def clear(self):
+        self._pending.clear()
+        self._locks.clear()
+        self._l1.clear()
+        self._l2.clear()
@@ -0,0 +1,174 @@
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class RequestTimings:
+    """Счётчики одного запроса: SQL, шаблоны и обращения к кэшу."""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - started
+            self.sql_count += 1
+
+
+def _current():
+    return getattr(_local, 'timings', None)
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, context):
+        timings = _current()
+        if timings is None or timings.template_depth:
+            return render(self, context)
+        # Вложенные include считаются внутри внешнего шаблона.
+        timings.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            timings.template_seconds += time.perf_counter() - started
+            timings.template_depth -= 1
+    return wrapper
+
+
+def _outer_cache_call(call, *args, **kwargs):
+    """Вызов кэша и признак того, что он не вложен в другой.
+
+    Многоуровневые кэши читают свои уровни тем же get, и считать
+    нужно только внешнее обращение.
+    """
+    timings = _current()
+    if timings is None or timings.cache_depth:
+        return call(*args, **kwargs), None
+    timings.cache_depth += 1
+    try:
+        return call(*args, **kwargs), timings
+    finally:
+        timings.cache_depth -= 1
+
+
+def _counted_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, *args, **kwargs):
+        value, timings = _outer_cache_call(
+            get, self, key, default, *args, **kwargs
+        )
+        if timings is not None:
+            if value is default:
+                timings.cache_misses += 1
+            else:
+                timings.cache_hits += 1
+        return value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, *args, **kwargs):
+        keys = list(keys)
+        values, timings = _outer_cache_call(
+            get_many, self, keys, *args, **kwargs
+        )
+        if timings is not None:
+            timings.cache_hits += len(values)
+            timings.cache_misses += len(keys) - len(values)
+        return values
+    return wrapper
+
+
+def _patch(cls, name, decorate):
+    method = getattr(cls, name)
+    if not getattr(method, '_server_timing', False):
+        patched = decorate(method)
+        patched._server_timing = True
+        setattr(cls, name, patched)
+
+
+def install_instrumentation():
+    """Оборачивает рендер шаблонов и чтение кэшей всех бэкендов.
+
+    Обёртки считают что-то только внутри запроса, выбранного для замера,
+    в остальное время они сразу передают вызов дальше.
+    """
+    _patch(Template, 'render', _timed_render)
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        _patch(backend, 'get', _counted_get)
+        # Базовый get_many сам вызывает get, его обращения уже посчитаны.
+        if backend.get_many is not BaseCache.get_many:
+            _patch(backend, 'get_many', _counted_get_many)
+
+
+class ServerTimingMiddleware:
+    """Замеряет запрос и отдаёт итоги в заголовке Server-Timing и в лог.
+
+    Замеряется доля SERVER_TIMING_SAMPLE_RATE запросов, остальные
+    проходят без накладных расходов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_instrumentation()
+
+    def __call__(self, request):
+        if random.random() >= settings.SERVER_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+        timings = _local.timings = RequestTimings()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            _local.timings = None
+        total = time.perf_counter() - started
+        response['Server-Timing'] = ', '.join((
+            f'sql;dur={timings.sql_seconds * 1000:.1f};'
+            f'desc="{timings.sql_count} queries"',
+            f'tpl;dur={timings.template_seconds * 1000:.1f}',
+            f'cache;desc="{timings.cache_hits} hits '
+            f'{timings.cache_misses} misses"',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 3),
+            'sql_count': timings.sql_count,
+            'sql_ms': round(timings.sql_seconds * 1000, 3),
+            'template_ms': round(timings.template_seconds * 1000, 3),
+            'cache_hits': timings.cache_hits,
+            'cache_misses': timings.cache_misses,
+        }))
+        return response
@@ -0,0 +1,133 @@
+import logging
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .views import too_many_requests
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+LOCK_SUFFIX = ':lock'
+LOCK_WAIT = 0.1
+LOCK_POLL = 0.005
+LOCK_RETRY_AFTER = 1
+
+logger = logging.getLogger(__name__)
+
+
+def parse_rate(rate):
+    """'10/m' → (10, 60): ёмкость корзины и время её полного пополнения."""
+    count, _, period = rate.partition('/')
+    return int(count), PERIODS[period]
+
+
+class TokenBucket:
+    """Корзина маркеров по алгоритму GCRA.
+
+    Вместо числа маркеров хранится одно время — когда корзина станет
+    полной. Запрос проходит, если до этого момента осталось не больше
+    времени пополнения всей корзины без одного маркера, и сдвигает его
+    на время пополнения одного маркера. Чтение и запись идут под
+    блокировкой ключа через cache.add(), который должен быть атомарным
+    между процессами.
+    """
+
+    def __init__(self, key, rate):
+        count, period = parse_rate(rate)
+        self.key = f'ratelimit:{key}'
+        self.interval = period / count
+        self.tolerance = period - self.interval
+
+    @property
+    def cache(self):
+        return caches[settings.RATELIMIT_CACHE]
+
+    def _lock(self):
+        deadline = time.monotonic() + LOCK_WAIT
+        while not self.cache.add(self.key + LOCK_SUFFIX, True, 1):
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(LOCK_POLL)
+        return True
+
+    def _unlock(self):
+        self.cache.delete(self.key + LOCK_SUFFIX)
+
+    def _full_at(self, now):
+        return max(self.cache.get(self.key, now), now)
+
+    def wait(self, now):
+        """Сколько секунд ждать маркера; 0 — маркер есть. Не берёт его."""
+        return max(self._full_at(now) - now - self.tolerance, 0)
+
+    def take(self, now):
+        full_at = self._full_at(now) + self.interval
+        self.cache.set(self.key, full_at, math.ceil(full_at - now))
+
+    def consume(self):
+        """Берёт маркер; возвращает 0 или сколько секунд ждать следующего."""
+        return consume([self])
+
+
+def consume(buckets):
+    """Берёт по маркеру из всех корзин или ни из одной.
+
+    Сначала блокируются и проверяются все корзины, и только если маркер
+    есть в каждой, он списывается. Иначе отказ одной корзины расходовал
+    бы маркеры остальных. Корзины блокируются в порядке ключей, чтобы
+    два запроса не ждали друг друга. Если блокировку взять не удалось,
+    запрос отклоняется с коротким ожиданием: пропуск при занятой корзине
+    пропускал бы именно всплески.
+    Возвращает 0 или сколько секунд ждать.
+    """
+    buckets = sorted(buckets, key=lambda bucket: bucket.key)
+    locked = []
+    try:
+        for bucket in buckets:
+            if not bucket._lock():
+                logger.warning('Корзина %s занята', bucket.key)
+                return LOCK_RETRY_AFTER
+            locked.append(bucket)
+        now = time.time()
+        wait = max((bucket.wait(now) for bucket in buckets), default=0)
+        if wait:
+            return wait
+        for bucket in buckets:
+            bucket.take(now)
+        return 0
+    finally:
+        for bucket in locked:
+            bucket._unlock()
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def buckets(name, request):
+    limits = settings.RATELIMITS.get(name, {})
+    if 'user' in limits and request.user.is_authenticated:
+        yield TokenBucket(f'{name}:user:{request.user.pk}', limits['user'])
+    if 'ip' in limits:
+        yield TokenBucket(f'{name}:ip:{client_ip(request)}', limits['ip'])
+
+
+def ratelimit(name, methods=('POST',)):
+    """Ограничивает частоту запросов к представлению.
+
+    Лимиты берутся из settings.RATELIMITS[name]: отдельная корзина
+    на пользователя и на IP. Запросы других методов не ограничиваются.
+    Сверх лимита отдаётся страница 429 с заголовком Retry-After.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if settings.RATELIMIT_ENABLED and request.method in methods:
+                wait = consume(buckets(name, request))
+                if wait:
+                    return too_many_requests(request, wait)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
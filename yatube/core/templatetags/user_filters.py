@@ -1,4 +1,5 @@
 from django import template
+from django.http import QueryDict
 
 register = template.Library()
 
@@ -6,3 +7,28 @@ register = template.Library()
 @register.filter()
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.filter()
+def elided_page_range(page):
+    """Номера страниц для пагинатора, длинные промежутки — многоточием."""
+    paginator = page.paginator
+    if hasattr(paginator, 'get_elided_page_range'):
+        return paginator.get_elided_page_range(page.number)
+    return paginator.page_range
+
+
+@register.simple_tag()
+def page_query(**kwargs):
+    """Строка запроса для ссылки на другую страницу выдачи.
+
+    Переносятся только явно переданные параметры: пагинатор попадает
+    в кэшированные фрагменты лент, и запрос первого посетителя не должен
+    оказаться в ссылках для остальных.
+    """
+    query = QueryDict(mutable=True)
+    query.update({
+        key: value for key, value in kwargs.items()
+        if value not in (None, '')
+    })
+    return query.urlencode()
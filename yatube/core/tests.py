@@ -1,6 +1,25 @@
+import json
+import tempfile
 from http import HTTPStatus
+from threading import Event, Thread, Timer
+from time import sleep, time
+from unittest import mock
+from uuid import uuid4
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .cache import LockingFileBasedCache, TwoTierCache
+from .ratelimit import LOCK_RETRY_AFTER, TokenBucket, consume, parse_rate
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +27,300 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+SERVER_TIMING_MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    *settings.MIDDLEWARE,
+]
+
+
+@override_settings(
+    MIDDLEWARE=SERVER_TIMING_MIDDLEWARE, SERVER_TIMING_SAMPLE_RATE=1
+)
+class ServerTimingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def metrics(self, response):
+        metrics = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    def test_header_reports_sql_templates_and_cache(self):
+        address = reverse('posts:post_detail', args=[self.post.pk])
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            response = self.client.get(address)
+        metrics = self.metrics(response)
+        self.assertEqual(set(metrics), {'sql', 'tpl', 'cache', 'total'})
+        self.assertGreater(float(metrics['tpl']['dur']), 0)
+        self.assertLessEqual(
+            float(metrics['sql']['dur']), float(metrics['total']['dur'])
+        )
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:post_detail')
+        self.assertEqual(record['status'], HTTPStatus.OK)
+        self.assertEqual(
+            metrics['sql']['desc'], f'"{record["sql_count"]} queries"'
+        )
+
+    def test_cache_hits_and_misses(self):
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            self.metrics(response)['cache']['desc'], '"2 hits 0 misses"'
+        )
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_untouched(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+@override_settings(CACHES={
+    **settings.CACHES,
+    'l2': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'two-tier-tests',
+    },
+})
+class TwoTierCacheTest(TestCase):
+    def setUp(self):
+        self.first = self.worker()
+        self.second = self.worker()
+        self.first.clear()
+
+    def worker(self):
+        """Кэш отдельного процесса: свой L1 над общим L2."""
+        worker = TwoTierCache('l2', {
+            'TIMEOUT': 10,
+            'OPTIONS': {'LOCK_ON_MISS': ['template.cache.']},
+        })
+        worker._l1 = LocMemCache(str(uuid4()), {})
+        return worker
+
+    def test_workers_share_l2(self):
+        self.first.set('key', 'value')
+        self.assertEqual(self.second.get('key'), 'value')
+        self.second.delete('key')
+        self.first._l1.clear()
+        self.assertIsNone(self.first.get('key'))
+
+    def test_expired_value_is_recomputed_once(self):
+        self.first.set('key', 'old')
+        with mock.patch('core.cache.time.time', return_value=time() + 11):
+            self.assertIsNone(self.first.get('key'))
+            self.assertEqual(self.second.get('key'), 'old')
+            self.first.set('key', 'new')
+        # Отстать от L2 другой процесс может только на время жизни L1.
+        self.second._l1.clear()
+        self.assertEqual(self.second.get('key'), 'new')
+
+    def test_early_refresh(self):
+        now = time()
+        self.first.get('key')
+        with mock.patch('core.cache.time.time', return_value=now + 5):
+            self.first.set('key', 'value')
+        # Расчёт занял 5 секунд, до истечения срока осталось 3.
+        with mock.patch('core.cache.time.time', return_value=now + 12):
+            with mock.patch('core.cache.random.random', return_value=0):
+                self.assertEqual(self.first.get('key'), 'value')
+            with mock.patch('core.cache.random.random', return_value=0.9):
+                self.assertIsNone(self.second.get('key'))
+                self.assertEqual(self.first.get('key'), 'value')
+
+    def test_get_or_set_waits_for_running_computation(self):
+        started, release = Event(), Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return 'computed'
+
+        thread = Thread(target=self.first.get_or_set, args=('key', slow))
+        thread.start()
+        started.wait(5)
+        second_calls = []
+        Timer(0.1, release.set).start()
+        value = self.second.get_or_set(
+            'key', lambda: second_calls.append(1) or 'duplicate'
+        )
+        thread.join(5)
+        self.assertEqual(value, 'computed')
+        self.assertEqual(second_calls, [])
+
+    def test_cold_fragment_is_rendered_by_one_reader(self):
+        key = 'template.cache.index_page.1'
+        self.assertIsNone(self.first.get(key))
+        Timer(0.1, self.first.set, args=(key, 'fragment')).start()
+        started = time()
+        self.assertEqual(self.second.get(key), 'fragment')
+        self.assertLess(time() - started, 5)
+
+    def test_plain_miss_does_not_wait(self):
+        self.assertIsNone(self.first.get('key'))
+        started = time()
+        self.assertIsNone(self.second.get('key'))
+        self.assertLess(time() - started, 1)
+
+    def test_has_key_and_incr_do_not_take_refresh_lock(self):
+        self.first.set('key', 1)
+        with mock.patch('core.cache.time.time', return_value=time() + 11):
+            self.assertTrue(self.first.has_key('key'))
+            self.assertEqual(self.first.incr('key'), 2)
+            self.assertEqual(self.second.decr('key', 2), 0)
+            self.assertIsNone(self.second.get('key'))
+        with self.assertRaises(ValueError):
+            self.first.incr('missing')
+        self.assertFalse(self.first.has_key('missing'))
+
+
+class LockingFileBasedCacheTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = LockingFileBasedCache(directory.name, {})
+
+    def test_add_is_atomic(self):
+        results = []
+        real_has_key = FileBasedCache.has_key
+
+        def slow_has_key(*args, **kwargs):
+            found = real_has_key(*args, **kwargs)
+            sleep(0.05)
+            return found
+
+        with mock.patch.object(FileBasedCache, 'has_key', slow_has_key):
+            threads = [
+                Thread(target=lambda: results.append(
+                    self.cache.add('key', 'value')
+                ))
+                for _ in range(3)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(sorted(results), [False, False, True])
+
+    def test_incr(self):
+        self.cache.set('key', 1)
+        self.assertEqual(self.cache.incr('key', 2), 3)
+        self.assertEqual(self.cache.get('key'), 3)
+
+
+@override_settings(
+    CACHES={
+        **settings.CACHES,
+        'ratelimit-tests': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'ratelimit-tests',
+        },
+    },
+    RATELIMIT_ENABLED=True,
+    RATELIMIT_CACHE='ratelimit-tests',
+    RATELIMITS={
+        'post_create': {'user': '2/m', 'ip': '3/m'},
+        'signup': {'ip': '1/h'},
+    },
+)
+class RateLimitTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.first = User.objects.create_user(username='first')
+        cls.second = User.objects.create_user(username='second')
+
+    def setUp(self):
+        caches['ratelimit-tests'].clear()
+
+    def create_post(self, user):
+        self.client.force_login(user)
+        return self.client.post(
+            reverse('posts:post_create'), {'text': 'Пост'}
+        )
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('10/m'), (10, 60))
+        self.assertEqual(parse_rate('5/h'), (5, 3600))
+
+    def test_bucket_refills_over_time(self):
+        bucket = TokenBucket('test', '2/m')
+        now = time()
+        with mock.patch('core.ratelimit.time.time', return_value=now):
+            self.assertEqual(bucket.consume(), 0)
+            self.assertEqual(bucket.consume(), 0)
+            self.assertAlmostEqual(bucket.consume(), 30)
+        with mock.patch('core.ratelimit.time.time', return_value=now + 30):
+            self.assertEqual(bucket.consume(), 0)
+            self.assertGreater(bucket.consume(), 0)
+
+    def test_busy_bucket_asks_to_retry_soon(self):
+        bucket = TokenBucket('test', '2/m')
+        with mock.patch.object(TokenBucket, '_lock', return_value=False):
+            with self.assertLogs('core.ratelimit', 'WARNING'):
+                self.assertEqual(bucket.consume(), LOCK_RETRY_AFTER)
+        self.assertEqual(bucket.consume(), 0)
+        self.assertEqual(bucket.consume(), 0)
+        self.assertGreater(bucket.consume(), 0)
+
+    def test_refused_request_takes_no_tokens(self):
+        user = TokenBucket('user', '2/m')
+        ip = TokenBucket('ip', '1/m')
+        self.assertEqual(consume([user, ip]), 0)
+        self.assertGreater(consume([user, ip]), 0)
+        self.assertEqual(user.consume(), 0)
+        self.assertGreater(user.consume(), 0)
+
+    def test_user_and_ip_limits(self):
+        for _ in range(2):
+            self.assertEqual(
+                self.create_post(self.first).status_code, HTTPStatus.FOUND
+            )
+        response = self.create_post(self.first)
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertTemplateUsed(response, 'core/429.html')
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(
+            self.create_post(self.second).status_code, HTTPStatus.FOUND
+        )
+        self.assertEqual(
+            self.create_post(self.second).status_code,
+            HTTPStatus.TOO_MANY_REQUESTS,
+        )
+
+    def test_reads_and_guests(self):
+        self.client.force_login(self.first)
+        for _ in range(3):
+            response = self.client.get(reverse('posts:post_create'))
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.client.logout()
+        data = {
+            'username': 'newcomer',
+            'password1': 'Sup3r-secret',
+            'password2': 'Sup3r-secret',
+        }
+        self.assertEqual(
+            self.client.post(reverse('users:signup'), data).status_code,
+            HTTPStatus.FOUND,
+        )
+        self.assertEqual(
+            self.client.post(reverse('users:signup'), data).status_code,
+            HTTPStatus.TOO_MANY_REQUESTS,
+        )
+
+    @override_settings(RATELIMIT_ENABLED=False)
+    def test_can_be_disabled(self):
+        for _ in range(3):
+            self.assertEqual(
+                self.create_post(self.first).status_code, HTTPStatus.FOUND
+            )
@@ -1,3 +1,5 @@
+import math
+
 from django.shortcuts import render
 
 
@@ -11,3 +13,12 @@ def csrf_failure(request, reason=''):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def too_many_requests(request, retry_after):
+    response = render(
+        request, 'core/429.html', {'retry_after': math.ceil(retry_after)},
+        status=429,
+    )
+    response['Retry-After'] = math.ceil(retry_after)
+    return response
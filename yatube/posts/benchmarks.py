@@ -0,0 +1,226 @@
+import math
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from statistics import mean
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from .models import Group, Post, User, UserStats
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу: значение из самой выборки."""
+    ordered = sorted(values)
+    rank = max(math.ceil(share * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class QueryTimer:
+    """Обёртка выполнения SQL: считает запросы и их время."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def measure(request, repeat, warmup=2, cold=False):
+    """Выполняет запрос repeat раз и сводит время, число и время SQL."""
+    for _ in range(warmup):
+        request()
+    timings, queries, sql_times = [], [], []
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            started = time.perf_counter()
+            response = request()
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f'Запрос завершился с кодом {response.status_code}'
+            )
+        queries.append(timer.count)
+        sql_times.append(timer.seconds * 1000)
+    return {
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'mean_ms': round(mean(timings), 3),
+        'queries': max(queries),
+        'sql_ms': round(mean(sql_times), 3),
+    }
+
+
+@contextmanager
+def isolated_caches():
+    """Подменяет кэши пустыми временными на время замеров.
+
+    Иначе замеры читали бы фрагменты и поколения лент другой базы или
+    сайта, а запросы на запись и cold-режим сдвигали и стирали бы их.
+    Файловые кэши переезжают во временный каталог, остальные получают
+    свой KEY_PREFIX.
+    """
+    root = tempfile.mkdtemp(prefix='yatube-benchmark-')
+    isolated = {}
+    for alias, params in settings.CACHES.items():
+        params = dict(params)
+        if issubclass(import_string(params['BACKEND']), FileBasedCache):
+            params['LOCATION'] = os.path.join(root, alias)
+        else:
+            params['KEY_PREFIX'] = os.path.basename(root)
+        isolated[alias] = params
+    try:
+        with override_settings(CACHES=isolated):
+            yield
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def rolled_back(request):
+    """Выполняет запрос на запись в транзакции, которая затем откатывается.
+
+    Иначе замер на текущей базе оставил бы в ней посты и комментарии.
+    Поколения лент, сдвинутые запросом, остаются в кэше из
+    isolated_caches() и пропадают вместе с ним.
+    """
+    def run():
+        with transaction.atomic():
+            response = request()
+            transaction.set_rollback(True)
+        return response
+    return run
+
+
+def scenarios():
+    """Запросы к страницам на самых тяжёлых объектах текущей базы."""
+    author = UserStats.objects.order_by('-posts_count').first()
+    reader = User.objects.annotate(
+        follows=Count('follower')
+    ).order_by('-follows').first()
+    group = Group.objects.annotate(
+        size=Count('posts')
+    ).order_by('-size').first()
+    post = Post.objects.order_by('-comments_count', '-pk').first()
+    if author is None or reader is None or group is None or post is None:
+        raise RuntimeError('Для замеров нужны пользователи, группы и посты.')
+    guest, client = Client(), Client()
+    client.force_login(reader)
+    return {
+        'index': lambda: guest.get(reverse('posts:index')),
+        'group_posts': lambda: guest.get(
+            reverse('posts:group_list', args=[group.slug])
+        ),
+        'profile': lambda: guest.get(
+            reverse('posts:profile', args=[author.user.username])
+        ),
+        'post_detail': lambda: guest.get(
+            reverse('posts:post_detail', args=[post.pk])
+        ),
+        'follow_index': lambda: client.get(reverse('posts:follow_index')),
+        'post_create': rolled_back(lambda: client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост из замера', 'group': group.pk},
+        )),
+        'add_comment': rolled_back(lambda: client.post(
+            reverse('posts:add_comment', args=[post.pk]),
+            {'text': 'Комментарий из замера'},
+        )),
+    }
+
+
+def run(repeat, cold=False, names=None):
+    results = {}
+    with isolated_caches(), override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            RATELIMIT_ENABLED=False,
+            COMMENT_WRITE_BEHIND=False):
+        for name, request in scenarios().items():
+            if names and name not in names:
+                continue
+            results[name] = measure(request, repeat, cold=cold)
+    return results
+
+
+@contextmanager
+def dataset(size, data_dir, seed=0):
+    """Переключает соединение на базу с size постами.
+
+    Базы создаются механизмом тестовых баз с keepdb, поэтому набор
+    данных генерируется один раз и переиспользуется следующими замерами.
+    Кэши на время генерации и замеров свои у каждого набора.
+    """
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings.get('NAME')
+    if connection.vendor == 'sqlite':
+        os.makedirs(data_dir, exist_ok=True)
+        test_name = os.path.join(data_dir, f'benchmark_{size}.sqlite3')
+    else:
+        test_name = f'{connection.settings_dict["NAME"]}_benchmark_{size}'
+    test_settings['NAME'] = test_name
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False, keepdb=True
+    )
+    try:
+        missing = size - Post.objects.count()
+        if missing > 0:
+            with isolated_caches():
+                call_command(
+                    'generate_data',
+                    users=max(size // 10, 10),
+                    posts=missing,
+                    comments=missing,
+                    seed=seed + size,
+                    prefix=f'bench{size}-',
+                )
+        yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=True
+        )
+        test_settings['NAME'] = old_test_name
+
+
+def compare(baseline, current, threshold):
+    """Находит ухудшения current относительно baseline.
+
+    Время считается ухудшившимся, если медиана выросла больше чем
+    на threshold (доля), число запросов — при любом росте.
+    """
+    regressions = []
+    for size, views in current['results'].items():
+        for name, metrics in views.items():
+            old = baseline['results'].get(size, {}).get(name)
+            if old is None:
+                continue
+            if metrics['p50_ms'] > old['p50_ms'] * (1 + threshold):
+                regressions.append(
+                    f'{size}/{name}: p50 {old["p50_ms"]} → '
+                    f'{metrics["p50_ms"]} мс'
+                )
+            if metrics['queries'] > old['queries']:
+                regressions.append(
+                    f'{size}/{name}: запросов {old["queries"]} → '
+                    f'{metrics["queries"]}'
+                )
+    return regressions
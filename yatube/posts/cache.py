@@ -0,0 +1,54 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+
+GENERATION_KEY = 'feed_generation:{}'
+
+
+def index_feed():
+    return 'index'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def trending_feed():
+    return 'trending'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def get_generation(feed):
+    """Текущее поколение ленты: входит в ключи её кэшированных фрагментов.
+
+    Поколение — случайный токен, а не счётчик, поэтому после сброса
+    кэша или базы старые фрагменты не могут совпасть с новыми ключами.
+    """
+    key = GENERATION_KEY.format(feed)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid4().hex, None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(*feeds):
+    """Сдвигает поколение лент, и их старые фрагменты больше не читаются."""
+    cache.set_many(
+        {GENERATION_KEY.format(feed): uuid4().hex for feed in feeds},
+        None,
+    )
+
+
+def post_feeds(post, *group_ids):
+    """Ленты, в которых показывается пост, включая его прежние группы."""
+    feeds = {index_feed(), author_feed(post.author_id)}
+    feeds.update(
+        group_feed(group_id)
+        for group_id in (post.group_id, *group_ids)
+        if group_id is not None
+    )
+    return feeds
@@ -0,0 +1,174 @@
+from django.db.models import Count, F
+
+from .cache import group_feed, index_feed
+from .models import Comment, FeedCounter, Follow, Group, Post, User, UserStats
+
+
+def refresh_user_stats(user_id):
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=user_id).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=user_id
+            ).count(),
+        },
+    )
+    return stats
+
+
+def get_stats(user):
+    """Возвращает счётчики пользователя, создавая их при первом обращении."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        user.stats = refresh_user_stats(user.pk)
+        return user.stats
+
+
+def change_user_counter(user_id, field, delta):
+    """Сдвигает счётчик одним UPDATE.
+
+    Если строки счётчиков ещё нет, при росте она создаётся пересчётом,
+    а при уменьшении ничего не делается: её пересчитает get_stats.
+    """
+    updated = UserStats.objects.filter(
+        user_id=user_id, **{f'{field}__gte': -delta}
+    ).update(**{field: F(field) + delta})
+    if not updated and delta > 0:
+        refresh_user_stats(user_id)
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(
+        pk=post_id, comments_count__gte=-delta
+    ).update(comments_count=F('comments_count') + delta)
+
+
+def feed_posts(feed):
+    """Посты ленты со счётчиком: общей или ленты группы."""
+    if feed == index_feed():
+        return Post.objects.all()
+    kind, _, pk = feed.partition(':')
+    if kind != 'group':
+        raise ValueError(f'У ленты {feed} нет счётчика')
+    return Post.objects.filter(group_id=pk)
+
+
+def refresh_feed_count(feed):
+    counter, _ = FeedCounter.objects.update_or_create(
+        feed=feed, defaults={'count': feed_posts(feed).count()}
+    )
+    return counter.count
+
+
+def get_feed_count(feed):
+    """Число постов ленты из счётчика; без счётчика он создаётся пересчётом."""
+    count = FeedCounter.objects.filter(feed=feed).values_list(
+        'count', flat=True
+    ).first()
+    if count is None:
+        count = refresh_feed_count(feed)
+    return count
+
+
+def change_feed_count(feed, delta):
+    updated = FeedCounter.objects.filter(
+        feed=feed, count__gte=-delta
+    ).update(count=F('count') + delta)
+    if not updated and delta > 0:
+        refresh_feed_count(feed)
+
+
+def _chunks(queryset, chunk_size):
+    """Идёт по первичным ключам пачками без OFFSET."""
+    last_pk = 0
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', flat=True
+            )[:chunk_size]
+        )
+        if not pks:
+            break
+        yield pks
+        last_pk = pks[-1]
+
+
+def _counts(queryset, field, pks):
+    return dict(
+        queryset.filter(**{f'{field}__in': pks}).values_list(
+            field
+        ).annotate(total=Count('pk')).order_by()
+    )
+
+
+def repair_user_stats(chunk_size=1000):
+    """Пересчитывает счётчики пользователей, возвращает число исправленных."""
+    repaired = 0
+    for pks in _chunks(User.objects.all(), chunk_size):
+        posts = _counts(Post.objects.all(), 'author_id', pks)
+        followers = _counts(Follow.objects.all(), 'author_id', pks)
+        existing = UserStats.objects.in_bulk(pks)
+        changed, missing = [], []
+        for pk in pks:
+            actual = (posts.get(pk, 0), followers.get(pk, 0))
+            stats = existing.get(pk)
+            if stats is None:
+                missing.append(UserStats(
+                    user_id=pk,
+                    posts_count=actual[0],
+                    followers_count=actual[1],
+                ))
+            elif (stats.posts_count, stats.followers_count) != actual:
+                stats.posts_count, stats.followers_count = actual
+                changed.append(stats)
+        UserStats.objects.bulk_update(
+            changed, ['posts_count', 'followers_count']
+        )
+        UserStats.objects.bulk_create(missing)
+        repaired += len(changed) + len(missing)
+    return repaired
+
+
+def repair_comment_counts(chunk_size=1000):
+    """Пересчитывает Post.comments_count, возвращает число исправленных."""
+    repaired = 0
+    for pks in _chunks(Post.objects.all(), chunk_size):
+        comments = _counts(Comment.objects.all(), 'post_id', pks)
+        changed = []
+        for post in Post.objects.filter(pk__in=pks).only('comments_count'):
+            actual = comments.get(post.pk, 0)
+            if post.comments_count != actual:
+                post.comments_count = actual
+                changed.append(post)
+        Post.objects.bulk_update(changed, ['comments_count'])
+        repaired += len(changed)
+    return repaired
+
+
+def repair_feed_counts():
+    """Пересчитывает счётчики лент, возвращает число исправленных."""
+    actual = {index_feed(): Post.objects.count()}
+    actual.update(
+        (group_feed(group_id), 0)
+        for group_id in Group.objects.values_list('pk', flat=True)
+    )
+    actual.update(
+        (group_feed(group_id), total)
+        for group_id, total in Post.objects.filter(
+            group__isnull=False
+        ).values_list('group_id').annotate(total=Count('pk')).order_by()
+    )
+    existing = FeedCounter.objects.in_bulk(list(actual))
+    changed, missing = [], []
+    for feed, count in actual.items():
+        counter = existing.get(feed)
+        if counter is None:
+            missing.append(FeedCounter(feed=feed, count=count))
+        elif counter.count != count:
+            counter.count = count
+            changed.append(counter)
+    FeedCounter.objects.bulk_update(changed, ['count'])
+    FeedCounter.objects.bulk_create(missing)
+    return len(changed) + len(missing)
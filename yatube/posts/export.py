@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Group, Post
+
+# Поля выгрузки: имя колонки и путь к значению, id всегда первый.
+# Авторы и группы выгружаются по username и slug, чтобы файл читался
+# без чужих id.
+TABLES = {
+    'groups': (Group, (
+        ('id', 'id'), ('slug', 'slug'), ('title', 'title'),
+        ('description', 'description'),
+    )),
+    'posts': (Post, (
+        ('id', 'id'), ('author', 'author__username'),
+        ('group', 'group__slug'), ('text', 'text'),
+        ('pub_date', 'pub_date'), ('image', 'image'),
+    )),
+    'comments': (Comment, (
+        ('id', 'id'), ('post', 'post_id'), ('author', 'author__username'),
+        ('text', 'text'), ('created', 'created'),
+    )),
+    'follows': (Follow, (
+        ('id', 'id'), ('user', 'user__username'),
+        ('author', 'author__username'),
+    )),
+}
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def columns(table):
+    return [name for name, _ in TABLES[table][1]]
+
+
+def chunks(table, chunk_size):
+    """Кортежи значений колонок пачками по chunk_size, по возрастанию id.
+
+    Каждая пачка — отдельный запрос с id > последнего прочитанного,
+    поэтому в памяти всегда не больше одной пачки, а запросы не
+    замедляются к концу таблицы, как с OFFSET.
+    """
+    model, fields = TABLES[table]
+    queryset = model.objects.values_list(
+        *(path for _, path in fields)
+    ).order_by('pk')
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_id)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def ndjson_chunks(table, chunk_size):
+    names = columns(table)
+    for rows in chunks(table, chunk_size):
+        yield ''.join(
+            json.dumps(
+                dict(zip(names, row)),
+                cls=DjangoJSONEncoder, ensure_ascii=False,
+            ) + '\n'
+            for row in rows
+        )
+
+
+def csv_chunks(table, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns(table))
+    for rows in chunks(table, chunk_size):
+        writer.writerows(map(_value, row) for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream(table, fmt='ndjson', compress=False, chunk_size=1000):
+    """Байты выгрузки таблицы, по куску на пачку строк.
+
+    С compress=True куски сжимаются на лету в один поток gzip.
+    """
+    encode = ndjson_chunks if fmt == 'ndjson' else csv_chunks
+    if not compress:
+        for text in encode(table, chunk_size):
+            yield text.encode()
+        return
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for text in encode(table, chunk_size):
+        data = compressor.compress(text.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def filename(table, fmt, compress=False):
+    return f'{table}.{fmt}' + ('.gz' if compress else '')
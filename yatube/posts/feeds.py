@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import parse_http_date_safe, quote_etag
+from django.utils.text import Truncator
+
+from .cache import author_feed, get_generation, group_feed, index_feed
+from .models import Group, Post, User
+
+FEED_TYPES = {'rss': Rss201rev2Feed, 'atom': Atom1Feed}
+RENDERED_KEY = 'syndication:{}:{}:{}'
+
+
+class PostsFeed(Feed):
+    def item_title(self, post):
+        return Truncator(post.text).words(8)
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', args=[post.pk])
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+
+class IndexFeed(PostsFeed):
+    title = 'Yatube'
+    link = reverse_lazy('posts:index')
+    description = 'Последние записи на сайте'
+
+    def items(self):
+        return Post.objects.for_feed()[:settings.SYNDICATION_ITEMS]
+
+
+class GroupFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return group.title
+
+    def link(self, group):
+        return reverse('posts:group_list', args=[group.slug])
+
+    def description(self, group):
+        return group.description
+
+    def items(self, group):
+        return group.posts.for_feed()[:settings.SYNDICATION_ITEMS]
+
+
+class AuthorFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return author.get_full_name() or author.username
+
+    def link(self, author):
+        return reverse('posts:profile', args=[author.username])
+
+    def description(self, author):
+        return f'Записи автора {self.title(author)}'
+
+    def items(self, author):
+        return author.posts.for_feed()[:settings.SYNDICATION_ITEMS]
+
+
+def serve(request, feed_class, feed, kind, **kwargs):
+    """Отдаёт ленту из кэша с ETag и Last-Modified.
+
+    Готовый XML хранится под ключом с поколением ленты и живёт, пока
+    поколение не сменит запись поста. ETag — это поколение, а
+    Last-Modified Feed берёт из даты самого свежего поста, поэтому
+    ответ 304 не читает посты из базы.
+    """
+    if kind not in FEED_TYPES:
+        raise Http404
+    generation = get_generation(feed)
+    key = RENDERED_KEY.format(feed, kind, generation)
+    rendered = cache.get(key)
+    if rendered is None:
+        syndication = feed_class()
+        syndication.feed_type = FEED_TYPES[kind]
+        syndication.subtitle = syndication.description
+        response = syndication(request, **kwargs)
+        rendered = (
+            response.content,
+            response['Content-Type'],
+            response.get('Last-Modified'),
+        )
+        cache.set(key, rendered, settings.FEED_CACHE_TIMEOUT)
+    content, content_type, last_modified = rendered
+    etag = quote_etag(f'{kind}-{generation}')
+    response = HttpResponse(content, content_type=content_type)
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = last_modified
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=parse_http_date_safe(last_modified or ''),
+        response=response,
+    )
+
+
+def index(request, kind):
+    return serve(request, IndexFeed, index_feed(), kind)
+
+
+def group(request, slug, kind):
+    group_id = get_object_or_404(
+        Group.objects.values_list('pk', flat=True), slug=slug
+    )
+    return serve(request, GroupFeed, group_feed(group_id), kind, slug=slug)
+
+
+def profile(request, username, kind):
+    author_id = get_object_or_404(
+        User.objects.values_list('pk', flat=True), username=username
+    )
+    return serve(
+        request, AuthorFeed, author_feed(author_id), kind, username=username
+    )
@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .models import Follow
+
+FOLLOWING_KEY = 'following:{}'
+
+
+def _pk(user):
+    return getattr(user, 'pk', user)
+
+
+def following_ids(user):
+    """Множество id авторов, на которых подписан пользователь.
+
+    Множество хранится в кэше целиком и сбрасывается сигналами Follow.
+    """
+    user_id = _pk(user)
+    return cache.get_or_set(
+        FOLLOWING_KEY.format(user_id),
+        lambda: frozenset(
+            Follow.objects.filter(user_id=user_id).values_list(
+                'author_id', flat=True
+            )
+        ),
+        settings.FOLLOWING_CACHE_TIMEOUT,
+    )
+
+
+def is_following(user, authors):
+    """Id тех авторов из authors, на которых подписан user.
+
+    Авторы передаются объектами или id; для гостя результат пустой.
+    """
+    if not getattr(user, 'is_authenticated', True):
+        return set()
+    followed = following_ids(user)
+    return {pk for pk in map(_pk, authors) if pk in followed}
+
+
+def forget(user_id):
+    key = FOLLOWING_KEY.format(user_id)
+    cache.delete(key)
+    # Читатель между сбросом и фиксацией транзакции мог закэшировать
+    # старое множество, поэтому после фиксации ключ сбрасывается ещё раз.
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def follow(user, author):
+    """Подписывает одним INSERT, возвращает False, если подписка была.
+
+    Повторную подписку отсекает уникальный индекс, поэтому одновременные
+    запросы не создают дублей и не падают.
+    """
+    user_id, author_id = _pk(user), _pk(author)
+    if user_id == author_id:
+        return False
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user_id=user_id, author_id=author_id)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow(user, author):
+    """Отписывает; возвращает, была ли подписка.
+
+    У Follow нет зависимых моделей, поэтому delete() обходится одним
+    SELECT для сигналов и одним DELETE.
+    """
+    deleted, _ = Follow.objects.filter(
+        user_id=_pk(user), author_id=_pk(author)
+    ).delete()
+    return bool(deleted)
@@ -0,0 +1,98 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, ImageSequence
+
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True},
+    'PNG': {'optimize': True},
+}
+# Поля Image.info, которые описывают сам растр или анимацию. Остальное —
+# метаданные (EXIF, XMP, ICC, текст PNG, комментарии) и при записи
+# отбрасывается.
+IMAGE_INFO = {
+    'jfif', 'jfif_version', 'jfif_unit', 'jfif_density', 'dpi', 'adobe',
+    'adobe_transform', 'progressive', 'progression', 'version', 'background',
+    'duration', 'loop', 'extension', 'transparency', 'gamma', 'interlace',
+    'aspect', 'compression',
+}
+
+
+def check_upload(upload):
+    """Проверяет размер файла и число пикселей по заголовку, не декодируя."""
+    if upload.size > settings.POST_IMAGE_MAX_BYTES:
+        raise ValidationError(
+            'Файл больше %(limit)s МБ.',
+            code='file_too_large',
+            params={'limit': settings.POST_IMAGE_MAX_BYTES // 2 ** 20},
+        )
+    upload.seek(0)
+    with Image.open(upload) as image:
+        width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка больше %(limit)s мегапикселей.',
+            code='too_many_pixels',
+            params={'limit': settings.POST_IMAGE_MAX_PIXELS // 10 ** 6},
+        )
+
+
+def has_metadata(image):
+    return any(key not in IMAGE_INFO for key in image.info)
+
+
+def shrink_frames(image, max_edge):
+    """Уменьшает кадры анимации по одному; возвращает кадры и их длительность.
+
+    В памяти остаются только уменьшенные кадры.
+    """
+    frames, durations = [], []
+    for frame in ImageSequence.Iterator(image):
+        durations.append(frame.info.get('duration', 100))
+        frame = frame.convert('RGBA')
+        frame.thumbnail((max_edge, max_edge))
+        frames.append(frame)
+    return frames, durations
+
+
+def shrink_upload(upload):
+    """Уменьшает картинку до POST_IMAGE_MAX_EDGE и убирает метаданные.
+
+    JPEG декодируется сразу в уменьшенном масштабе через draft(), поэтому
+    полноразмерный растр в памяти не появляется; анимация уменьшается
+    покадрово. Небольшие картинки без метаданных возвращаются как есть.
+    """
+    max_edge = settings.POST_IMAGE_MAX_EDGE
+    upload.seek(0)
+    with Image.open(upload) as image:
+        image_format = image.format
+        if max(image.size) <= max_edge and not has_metadata(image):
+            upload.seek(0)
+            return upload
+        output = BytesIO()
+        if getattr(image, 'is_animated', False):
+            frames, durations = shrink_frames(image, max_edge)
+            frames[0].save(
+                output, image_format, save_all=True,
+                append_images=frames[1:], duration=durations,
+                loop=image.info.get('loop', 0), disposal=2,
+            )
+        else:
+            image.draft(image.mode, (max_edge, max_edge))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_edge, max_edge))
+            image.info = {
+                key: value for key, value in image.info.items()
+                if key in IMAGE_INFO
+            }
+            image.save(
+                output, image_format, **SAVE_OPTIONS.get(image_format, {})
+            )
+    return ContentFile(output.getvalue(), name=upload.name)
+
+
+def process_upload(upload):
+    check_upload(upload)
+    return shrink_upload(upload)
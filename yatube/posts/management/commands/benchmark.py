@@ -0,0 +1,112 @@
+import json
+import os
+import tempfile
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts.benchmarks import compare, dataset, run
+from posts.models import Post
+
+
+def load_report(path):
+    try:
+        with open(path, encoding='utf-8') as report:
+            return json.load(report)
+    except (OSError, ValueError) as error:
+        raise CommandError(f'Не удалось прочитать отчёт {path}: {error}')
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку, число и время SQL-запросов основных страниц '
+        'на наборах данных разного размера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='*', default=[],
+            help=(
+                'Размеры наборов в постах, например 10000 100000 1000000. '
+                'Без них замер идёт на текущей базе.'
+            ),
+        )
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument(
+            '--views', nargs='*', default=[],
+            help='Замерять только эти страницы.',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--data-dir',
+            default=os.path.join(tempfile.gettempdir(), 'yatube-benchmarks'),
+            help='Каталог для баз SQLite с наборами данных.',
+        )
+        parser.add_argument(
+            '--output', help='Куда записать отчёт в JSON.',
+        )
+        parser.add_argument(
+            '--baseline', help='Отчёт, с которым сравнить этот замер.',
+        )
+        parser.add_argument(
+            '--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+            help='Сравнить два готовых отчёта без замеров.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост медианы задержки, доля.',
+        )
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            baseline, current = map(load_report, options['compare'])
+        else:
+            baseline = options['baseline'] and load_report(
+                options['baseline']
+            )
+            current = self.measure(options)
+            if options['output']:
+                with open(options['output'], 'w', encoding='utf-8') as out:
+                    json.dump(current, out, ensure_ascii=False, indent=2)
+            if not baseline:
+                return
+        regressions = compare(baseline, current, options['threshold'])
+        if regressions:
+            for line in regressions:
+                self.stderr.write(line)
+            raise CommandError(f'Ухудшений: {len(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Ухудшений нет'))
+
+    def measure(self, options):
+        results = {}
+        if options['sizes']:
+            for size in options['sizes']:
+                with dataset(size, options['data_dir']):
+                    results[str(size)] = self.run(options, size)
+        else:
+            results[str(Post.objects.count())] = self.run(options)
+        return {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'repeat': options['repeat'],
+                'cold': options['cold'],
+            },
+            'results': results,
+        }
+
+    def run(self, options, size=None):
+        results = run(options['repeat'], options['cold'], options['views'])
+        for name, metrics in results.items():
+            self.stdout.write(
+                f'{size or "текущая база"} {name}: ' + ', '.join(
+                    f'{key}={value}' for key, value in metrics.items()
+                )
+            )
+        return results
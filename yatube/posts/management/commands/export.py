@@ -0,0 +1,47 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import FORMATS, TABLES, filename, stream
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии и подписки в NDJSON или CSV '
+        'по файлу на таблицу, не загружая таблицы в память целиком.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tables', nargs='*',
+            help=f'Какие таблицы выгрузить: {", ".join(TABLES)}. '
+                 'По умолчанию все.',
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS, default='ndjson',
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжимать файлы gzip.',
+        )
+        parser.add_argument(
+            '--output-dir', default='.',
+            help='Каталог, куда сохранить файлы.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        unknown = set(options['tables']) - set(TABLES)
+        if unknown:
+            raise CommandError(f'Нет таблиц: {", ".join(sorted(unknown))}')
+        os.makedirs(options['output_dir'], exist_ok=True)
+        for table in options['tables'] or TABLES:
+            path = os.path.join(options['output_dir'], filename(
+                table, options['format'], options['gzip']
+            ))
+            with open(path, 'wb') as file:
+                for data in stream(
+                        table, options['format'], options['gzip'],
+                        options['chunk_size']):
+                    file.write(data)
+            self.stdout.write(f'{table}: {path}')
+        self.stdout.write(self.style.SUCCESS('Выгрузка завершена'))
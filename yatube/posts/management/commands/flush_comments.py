@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.spool import flush, recover
+
+
+class Command(BaseCommand):
+    help = (
+        'Записывает в базу комментарии из очереди на диске пачками. '
+        'Нужен, когда включён COMMENT_WRITE_BEHIND.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.COMMENT_FLUSH_BATCH,
+            help='Сколько комментариев записывать одним запросом.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь и завершиться.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза между опросами пустой очереди, секунды.',
+        )
+
+    def handle(self, *args, **options):
+        recovered = recover()
+        if recovered:
+            self.stdout.write(f'Возвращено в очередь: {recovered}')
+        total = 0
+        while True:
+            flushed = flush(options['batch_size'])
+            if not flushed:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+            total += flushed
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано комментариев: {total}'
+        ))
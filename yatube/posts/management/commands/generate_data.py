@@ -0,0 +1,311 @@
+import random
+import time
+from bisect import bisect
+from collections import Counter
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from posts import cache, counters, thumbnails, timeline
+from posts.models import Comment, Follow, Group, Post, UserStats
+from posts.utilites import explicit_dates
+
+User = get_user_model()
+
+TEXT_POOL_SIZE = 2000
+NAME_POOL_SIZE = 200
+IMAGE_POOL_SIZE = 16
+IMAGE_SIZE = (960, 540)
+# Показатели степенного распределения: популярность авторов у подписчиков
+# и их активность. Активность мягче, иначе ленты самых пишущих авторов
+# раздуваются на порядки.
+FOLLOW_EXPONENT = 1.0
+ACTIVITY_EXPONENT = 0.7
+# Доля подписок на пользователя по Парето с alpha=1.5, среднее равно 3.
+FOLLOW_PARETO_ALPHA = 1.5
+FOLLOW_PARETO_MEAN = 3
+GROUP_SHARE = 0.7
+
+
+def next_pk(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+def write(model, objects, batch_size):
+    objects = iter(objects)
+    written = 0
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return written
+        model.objects.bulk_create(batch)
+        written += len(batch)
+
+
+def power_law(rng, items, exponent):
+    """Выбиралка элементов в случайном порядке с весами 1 / rank^exponent."""
+    items = list(items)
+    rng.shuffle(items)
+    cum_weights = list(accumulate(
+        1 / (rank + 1) ** exponent for rank in range(len(items))
+    ))
+    total = cum_weights[-1]
+
+    def choose():
+        return items[bisect(cum_weights, rng.random() * total)]
+    return choose
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками для нагрузочных тестов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows', type=float, default=20,
+            help='Среднее число подписок на пользователя.',
+        )
+        parser.add_argument(
+            '--images', type=float, default=0,
+            help='Доля постов с картинкой, от 0 до 1.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить даты постов.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix', default='load',
+            help='Префикс имён пользователей и адресов групп.',
+        )
+        parser.add_argument(
+            '--password', default='password',
+            help='Общий пароль всех созданных пользователей.',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 or options['groups'] < 1:
+            raise CommandError('Нужны хотя бы два пользователя и одна группа.')
+        if not 0 <= options['images'] <= 1:
+            raise CommandError('--images задаётся долей от 0 до 1.')
+        self.options = options
+        self.batch_size = options['batch_size']
+        self.rng = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.now = timezone.now()
+        started = time.monotonic()
+        with transaction.atomic(), explicit_dates(
+            Post._meta.get_field('pub_date'),
+            Comment._meta.get_field('created'),
+        ):
+            self.step('Пользователи', self.create_users)
+            self.step('Группы', self.create_groups)
+            self.step('Подписки', self.create_follows)
+            self.step('Посты', self.create_posts)
+            self.step('Комментарии', self.create_comments)
+            self.step('Счётчики', self.create_stats)
+            self.step('Ленты подписок', self.create_timelines)
+            self.reset_sequences()
+        cache.bump_generation(cache.index_feed())
+        for name in self.images:
+            thumbnails.schedule(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с'
+        ))
+
+    def step(self, title, create):
+        started = time.monotonic()
+        count = create()
+        self.stdout.write(
+            f'{title}: {count} за {time.monotonic() - started:.1f} с'
+        )
+
+    def create_users(self):
+        first_names = [
+            self.fake.first_name() for _ in range(NAME_POOL_SIZE)
+        ]
+        last_names = [self.fake.last_name() for _ in range(NAME_POOL_SIZE)]
+        password = make_password(self.options['password'])
+        start = next_pk(User)
+        self.users = range(start, start + self.options['users'])
+        prefix = self.options['prefix']
+        return write(User, (
+            User(
+                pk=pk,
+                username=f'{prefix}{pk}',
+                first_name=self.rng.choice(first_names),
+                last_name=self.rng.choice(last_names),
+                password=password,
+            )
+            for pk in self.users
+        ), self.batch_size)
+
+    def create_groups(self):
+        start = next_pk(Group)
+        self.groups = range(start, start + self.options['groups'])
+        prefix = self.options['prefix']
+        return write(Group, (
+            Group(
+                pk=pk,
+                title=f'{self.fake.word().capitalize()} {pk}',
+                slug=f'{prefix}-{pk}',
+                description=self.fake.sentence(),
+            )
+            for pk in self.groups
+        ), self.batch_size)
+
+    def create_follows(self):
+        rng = self.rng
+        choose_author = power_law(rng, self.users, FOLLOW_EXPONENT)
+        limit = len(self.users) // 2
+        self.follows = []
+        for user_id in self.users:
+            wanted = min(limit, int(
+                rng.paretovariate(FOLLOW_PARETO_ALPHA)
+                * self.options['follows'] / FOLLOW_PARETO_MEAN
+            ))
+            authors = set()
+            for _ in range(wanted * 3):
+                if len(authors) == wanted:
+                    break
+                author_id = choose_author()
+                if author_id != user_id:
+                    authors.add(author_id)
+            self.follows.extend(
+                (user_id, author_id) for author_id in sorted(authors)
+            )
+        self.followers = Counter(author_id for _, author_id in self.follows)
+        self.follow_start = next_pk(Follow)
+        return write(Follow, (
+            Follow(pk=pk, user_id=user_id, author_id=author_id)
+            for pk, (user_id, author_id) in enumerate(
+                self.follows, self.follow_start
+            )
+        ), self.batch_size)
+
+    def create_images(self):
+        storage = Post._meta.get_field('image').storage
+        names = []
+        for number in range(IMAGE_POOL_SIZE):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new('RGB', IMAGE_SIZE, color).save(buffer, 'JPEG')
+            names.append(storage.save(
+                f'posts/{self.options["prefix"]}-{number}.jpg',
+                ContentFile(buffer.getvalue()),
+            ))
+        return names
+
+    def create_posts(self):
+        rng = self.rng
+        count = self.options['posts']
+        self.images = (
+            self.create_images() if self.options['images'] and count else []
+        )
+        choose_author = power_law(rng, self.users, ACTIVITY_EXPONENT)
+        span = self.options['days'] * 24 * 60 * 60
+        # Даты по возрастанию, чтобы порядок id совпадал с порядком
+        # публикации, как у настоящих постов.
+        self.post_dates = sorted(
+            self.now - timedelta(seconds=rng.random() * span)
+            for _ in range(count)
+        )
+        self.post_authors = [choose_author() for _ in range(count)]
+        self.comment_posts = [
+            rng.randrange(count) for _ in range(self.options['comments'])
+        ] if count else []
+        comments_count = Counter(self.comment_posts)
+        texts = [
+            self.fake.paragraph(nb_sentences=rng.randint(1, 5))
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        self.post_start = next_pk(Post)
+
+        def posts():
+            for index in range(count):
+                group_id = (
+                    rng.choice(self.groups)
+                    if rng.random() < GROUP_SHARE else None
+                )
+                image = (
+                    rng.choice(self.images)
+                    if rng.random() < self.options['images'] else ''
+                )
+                yield Post(
+                    pk=self.post_start + index,
+                    text=rng.choice(texts),
+                    pub_date=self.post_dates[index],
+                    author_id=self.post_authors[index],
+                    group_id=group_id,
+                    image=image,
+                    comments_count=comments_count[index],
+                )
+        return write(Post, posts(), self.batch_size)
+
+    def create_comments(self):
+        rng = self.rng
+        texts = [self.fake.sentence() for _ in range(TEXT_POOL_SIZE)]
+        start = next_pk(Comment)
+
+        def comments():
+            for pk, index in enumerate(self.comment_posts, start):
+                pub_date = self.post_dates[index]
+                yield Comment(
+                    pk=pk,
+                    post_id=self.post_start + index,
+                    author_id=rng.choice(self.users),
+                    text=rng.choice(texts),
+                    created=pub_date + (self.now - pub_date) * rng.random(),
+                )
+        return write(Comment, comments(), self.batch_size)
+
+    def create_stats(self):
+        posts_count = Counter(self.post_authors)
+        counters.repair_feed_counts()
+        return write(UserStats, (
+            UserStats(
+                user_id=user_id,
+                posts_count=posts_count[user_id],
+                followers_count=self.followers[user_id],
+                pull_mode=(
+                    self.followers[user_id]
+                    >= settings.FEED_PULL_FOLLOWERS_THRESHOLD
+                ),
+            )
+            for user_id in self.users
+        ), self.batch_size)
+
+    def create_timelines(self):
+        pull_authors = [
+            author_id for author_id, count in self.followers.items()
+            if count >= settings.FEED_PULL_FOLLOWERS_THRESHOLD
+        ]
+        return timeline.fill(self.post_start, self.follow_start, pull_authors)
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Group, Follow, Post, Comment]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
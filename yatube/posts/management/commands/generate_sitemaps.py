@@ -0,0 +1,49 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from posts.sitemaps import (SECTIONS, render_index, render_shard,
+                            shard_count, shard_url)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сохраняет индекс и шарды карты сайта в файлы под теми же путями, '
+        'что и их адреса, чтобы их мог отдавать веб-сервер.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url', required=True,
+            help='Адрес сайта для ссылок, например https://yatube.ru',
+        )
+        parser.add_argument(
+            '--output-dir', default=settings.SITEMAP_ROOT,
+            help='Корень, от которого раскладываются файлы.',
+        )
+
+    def write(self, path, chunks):
+        path = os.path.join(self.output_dir, path.lstrip('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            for chunk in chunks:
+                file.write(chunk)
+        os.replace(temporary, path)
+
+    def handle(self, *args, **options):
+        self.output_dir = options['output_dir']
+        base_url = options['base_url'].rstrip('/')
+        shards = 0
+        for section in SECTIONS:
+            for number in range(1, shard_count(section) + 1):
+                self.write(
+                    shard_url(section, number),
+                    render_shard(base_url, section, number),
+                )
+                shards += 1
+        # Индекс пишется последним: в нём нет ссылок на ещё не готовые шарды.
+        self.write(reverse('posts:sitemap_index'), render_index(base_url))
+        self.stdout.write(self.style.SUCCESS(f'Шардов записано: {shards}'))
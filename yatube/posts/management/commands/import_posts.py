@@ -0,0 +1,338 @@
+import json
+import os
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import cache, counters, search, thumbnails, timeline
+from posts.models import Comment, Group, Post, TimelineEntry, UserStats
+from posts.utilites import explicit_dates
+
+from .generate_data import next_pk
+
+User = get_user_model()
+
+PHASES = ('start', 'posts', 'comments', 'finish', 'done')
+
+
+def parse_date(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        raise CommandError(f'Не разобрать дату: {value}')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def read_batches(path, skip, batch_size):
+    """Пачки разобранных строк NDJSON после первых skip строк."""
+    with open(path, encoding='utf-8') as file:
+        lines = islice(file, skip, None)
+        while True:
+            batch = [json.loads(line) for line in islice(lines, batch_size)]
+            if not batch:
+                return
+            yield batch
+
+
+def max_id(path):
+    if not path:
+        return 0
+    with open(path, encoding='utf-8') as file:
+        return max((json.loads(line)['id'] for line in file), default=0)
+
+
+def reserve_ids(model, last_id):
+    """Сдвигает автоинкремент model за last_id.
+
+    Иначе пост или комментарий, созданный на сайте во время загрузки,
+    займёт id из её диапазона, и загружаемая строка не вставится.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                'UPDATE sqlite_sequence SET seq = MAX(seq, %s) '
+                'WHERE name = %s',
+                [last_id, model._meta.db_table],
+            )
+            if not cursor.rowcount:
+                cursor.execute(
+                    'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                    [model._meta.db_table, last_id],
+                )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"GREATEST(%s, (SELECT COALESCE(MAX(id), 1) FROM {table})))",
+                [last_id],
+            )
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                f'ALTER TABLE {table} AUTO_INCREMENT = {int(last_id) + 1}'
+            )
+        else:
+            raise CommandError(
+                f'Не умею резервировать id в базе {connection.vendor}'
+            )
+
+
+def index_names(model):
+    with connection.cursor() as cursor:
+        return set(connection.introspection.get_constraints(
+            cursor, model._meta.db_table
+        ))
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты и комментарии из NDJSON (формат manage.py export) '
+        'пачками через bulk_create. Индексы, поиск, счётчики и ленты '
+        'перестраиваются в конце; прерванная загрузка продолжается '
+        'с сохранённой позиции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('posts', help='Файл постов NDJSON.')
+        parser.add_argument('--comments', help='Файл комментариев NDJSON.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл с позицией загрузки, по умолчанию <posts>.checkpoint.',
+        )
+
+    def handle(self, *args, **options):
+        for path in (options['posts'], options['comments']):
+            if path and not os.path.exists(path):
+                raise CommandError(f'Нет файла {path}')
+        self.batch_size = options['batch_size']
+        self.checkpoint = (
+            options['checkpoint'] or f'{options["posts"]}.checkpoint'
+        )
+        self.state = self.load_state(options['posts'], options['comments'])
+        if self.state['phase'] == 'done':
+            self.stdout.write('Загрузка уже завершена.')
+            return
+        started = PHASES.index(self.state['phase'])
+        for phase, step in (
+            ('start', self.defer_indexes),
+            ('posts', lambda: self.import_posts(options['posts'])),
+            ('comments', lambda: self.import_comments(options['comments'])),
+            ('finish', self.finish),
+        ):
+            if PHASES.index(phase) < started:
+                continue
+            self.save_state(phase=phase)
+            step()
+        self.save_state(phase='done')
+        skipped = self.state['skipped_posts'] + self.state['skipped_comments']
+        if skipped:
+            self.stderr.write(
+                f'Пропущено строк, уже бывших в базе или без поста: '
+                f'постов {self.state["skipped_posts"]}, '
+                f'комментариев {self.state["skipped_comments"]}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено постов: {self.state["posts"]}, '
+            f'комментариев: {self.state["comments"]}'
+        ))
+
+    def load_state(self, posts_path, comments_path):
+        if os.path.exists(self.checkpoint):
+            with open(self.checkpoint, encoding='utf-8') as file:
+                state = json.load(file)
+            state.setdefault('skipped_posts', 0)
+            state.setdefault('skipped_comments', 0)
+            return state
+        # Новые id — исходные плюс смещение: так повтор пачки после сбоя
+        # не создаёт дублей, а комментарии находят свои посты без карты id.
+        # Диапазон резервируется сразу, до первой пачки.
+        with transaction.atomic():
+            post_offset = next_pk(Post) - 1
+            comment_offset = next_pk(Comment) - 1
+            reserve_ids(Post, post_offset + max_id(posts_path))
+            reserve_ids(Comment, comment_offset + max_id(comments_path))
+        return {
+            'phase': 'start',
+            'post_offset': post_offset,
+            'comment_offset': comment_offset,
+            'posts': 0,
+            'comments': 0,
+            'skipped_posts': 0,
+            'skipped_comments': 0,
+        }
+
+    def save_state(self, **changes):
+        self.state.update(changes)
+        temporary = f'{self.checkpoint}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(self.state, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.checkpoint)
+
+    def defer_indexes(self):
+        """Снимает индексы лент и FTS: их дешевле построить один раз."""
+        search.uninstall_fts()
+        with connection.schema_editor() as editor:
+            for model in (Post, Comment):
+                existing = index_names(model)
+                for index in model._meta.indexes:
+                    if index.name in existing:
+                        editor.remove_index(model, index)
+
+    def restore_indexes(self):
+        with connection.schema_editor() as editor:
+            for model in (Post, Comment):
+                existing = index_names(model)
+                for index in model._meta.indexes:
+                    if index.name not in existing:
+                        editor.add_index(model, index)
+        search.install_fts()
+
+    def resolve(self, model, field, values, defaults):
+        """Id объектов по значениям уникального поля, недостающие создаются.
+
+        Карты держатся в памяти на всю загрузку: один запрос на пачку
+        только для новых значений.
+        """
+        if model not in self.maps:
+            self.maps[model] = dict(model.objects.values_list(field, 'pk'))
+        known = self.maps[model]
+        missing = {value for value in values if value not in known}
+        if missing:
+            model.objects.bulk_create(
+                [model(**{field: value}, **defaults(value))
+                 for value in missing],
+                ignore_conflicts=True,
+            )
+            known.update(model.objects.filter(
+                **{f'{field}__in': missing}
+            ).values_list(field, 'pk'))
+        return known
+
+    def insert(self, model, objects):
+        """Вставляет пачку, пропуская занятые id; возвращает число вставленных.
+
+        Занятыми id оказываются строки пачки, повторённой после сбоя.
+        """
+        pks = [obj.pk for obj in objects]
+        existing = model.objects.filter(pk__in=pks).count()
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+        return model.objects.filter(pk__in=pks).count() - existing
+
+    def authors(self, rows, key='author'):
+        password = make_password(None)
+        return self.resolve(
+            User, 'username', {row[key] for row in rows},
+            lambda username: {'password': password, 'is_active': False},
+        )
+
+    def import_posts(self, path):
+        self.maps = {}
+        offset = self.state['post_offset']
+        with explicit_dates(Post._meta.get_field('pub_date')):
+            for rows in read_batches(
+                    path, self.state['posts'], self.batch_size):
+                authors = self.authors(rows)
+                groups = self.resolve(
+                    Group, 'slug',
+                    {row['group'] for row in rows if row.get('group')},
+                    lambda slug: {'title': slug, 'description': slug},
+                )
+                with transaction.atomic():
+                    inserted = self.insert(Post, [
+                        Post(
+                            pk=offset + row['id'],
+                            author_id=authors[row['author']],
+                            group_id=groups.get(row.get('group')),
+                            text=row['text'],
+                            pub_date=parse_date(row['pub_date']),
+                            image=row.get('image') or '',
+                        )
+                        for row in rows
+                    ])
+                self.save_state(
+                    posts=self.state['posts'] + len(rows),
+                    skipped_posts=(
+                        self.state['skipped_posts'] + len(rows) - inserted
+                    ),
+                )
+                for name in {row['image'] for row in rows
+                             if row.get('image')}:
+                    thumbnails.schedule(name)
+                self.stdout.write(f'Постов: {self.state["posts"]}')
+
+    def import_comments(self, path):
+        if not path:
+            return
+        self.maps = {}
+        post_offset = self.state['post_offset']
+        offset = self.state['comment_offset']
+        with explicit_dates(Comment._meta.get_field('created')):
+            for rows in read_batches(
+                    path, self.state['comments'], self.batch_size):
+                authors = self.authors(rows)
+                posts = set(Post.objects.filter(
+                    pk__in={post_offset + row['post'] for row in rows}
+                ).values_list('pk', flat=True))
+                with transaction.atomic():
+                    inserted = self.insert(Comment, [
+                        Comment(
+                            pk=offset + row['id'],
+                            post_id=post_offset + row['post'],
+                            author_id=authors[row['author']],
+                            text=row['text'],
+                            created=parse_date(row['created']),
+                        )
+                        for row in rows
+                        if post_offset + row['post'] in posts
+                    ])
+                self.save_state(
+                    comments=self.state['comments'] + len(rows),
+                    skipped_comments=(
+                        self.state['skipped_comments'] + len(rows) - inserted
+                    ),
+                )
+                self.stdout.write(f'Комментариев: {self.state["comments"]}')
+
+    def finish(self):
+        self.stdout.write('Индексы и поиск')
+        self.restore_indexes()
+        self.stdout.write('Счётчики')
+        counters.repair_user_stats()
+        timeline.enter_pull_mode()
+        counters.repair_comment_counts()
+        counters.repair_feed_counts()
+        self.stdout.write('Ленты подписок')
+        post_start = self.state['post_offset'] + 1
+        TimelineEntry.objects.filter(
+            post_id__gte=post_start
+        ).delete()
+        timeline.fill(post_start, skip_authors=list(
+            UserStats.objects.filter(
+                pull_mode=True
+            ).values_list('user_id', flat=True)
+        ))
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Group, Post, Comment]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+        imported = Post.objects.filter(pk__gte=post_start)
+        cache.bump_generation(
+            cache.index_feed(),
+            *(cache.group_feed(pk) for pk in imported.values_list(
+                'group_id', flat=True
+            ).distinct() if pk is not None),
+            *(cache.author_feed(pk) for pk in imported.values_list(
+                'author_id', flat=True
+            ).distinct()),
+        )
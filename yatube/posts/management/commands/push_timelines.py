@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Возвращает в раскладку по лентам авторов, у которых стало меньше '
+        'подписчиков, чем нужно для чтения при запросе. Запускается '
+        'по расписанию, например из cron раз в несколько минут.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Скольким подписчикам раскладывать посты за раз.',
+        )
+
+    def handle(self, *args, **options):
+        authors = list(timeline.leaving_authors())
+        written = sum(
+            timeline.leave_pull_mode(author_id, options['batch_size'])
+            for author_id in authors
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Авторов возвращено в раскладку: {len(authors)}, '
+            f'записей в лентах: {written}'
+        ))
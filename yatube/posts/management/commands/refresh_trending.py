@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import refresh
+
+
+class Command(BaseCommand):
+    help = (
+        'Добавляет новые комментарии в рейтинг популярных постов. '
+        'Запускается по расписанию, например из cron раз в несколько минут.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Сколько комментариев читать из базы за раз.',
+        )
+
+    def handle(self, *args, **options):
+        processed = refresh(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Учтено новых комментариев: {processed}'
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.counters import (repair_comment_counts, repair_feed_counts,
+                            repair_user_stats)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики постов, подписчиков, комментариев '
+        'и постов в лентах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько строк пересчитывать за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        users = repair_user_stats(chunk_size)
+        timeline.enter_pull_mode()
+        posts = repair_comment_counts(chunk_size)
+        feeds = repair_feed_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: пользователей {users}, постов {posts}, '
+            f'лент {feeds}'
+        ))
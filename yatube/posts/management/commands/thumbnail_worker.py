@@ -0,0 +1,60 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts.models import Post
+from posts.thumbnails import claim_tasks, generate_thumbnails, schedule
+
+
+def _generate_in_worker(name):
+    try:
+        generate_thumbnails(name)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Готовит миниатюры картинок из очереди пулом потоков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Число потоков, которые готовят миниатюры.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь и завершиться.',
+        )
+        parser.add_argument(
+            '--backfill', action='store_true',
+            help='Поставить в очередь картинки всех постов.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза между опросами пустой очереди, секунды.',
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            images = Post.objects.exclude(image='').values_list(
+                'image', flat=True
+            )
+            for name in images.iterator():
+                schedule(name)
+        total = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                names = claim_tasks(options['workers'] * 10)
+                if not names:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+                list(pool.map(_generate_in_worker, names))
+                total += len(names)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {total}'
+        ))
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def install_fts(apps, schema_editor):
+    from posts.search import install_fts
+    install_fts(schema_editor.connection)
+
+
+def uninstall_fts(apps, schema_editor):
+    from posts.search import uninstall_fts
+    uninstall_fts(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_thumbnailtask'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_fts, uninstall_fts),
+    ]
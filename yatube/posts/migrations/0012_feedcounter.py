@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:57
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_feed_counters(apps, schema_editor):
+    FeedCounter = apps.get_model('posts', 'FeedCounter')
+    Post = apps.get_model('posts', 'Post')
+    groups = Post.objects.filter(group__isnull=False).values_list(
+        'group_id'
+    ).annotate(total=Count('pk')).order_by()
+    FeedCounter.objects.bulk_create([
+        FeedCounter(feed='index', count=Post.objects.count()),
+        *(
+            FeedCounter(feed=f'group:{group_id}', count=total)
+            for group_id, total in groups
+        ),
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedCounter',
+            fields=[
+                ('feed', models.CharField(help_text='Имя ленты: index или group:<id>', max_length=64, primary_key=True, serialize=False, verbose_name='Лента')),
+                ('count', models.PositiveIntegerField(default=0, help_text='Число постов в ленте', verbose_name='Постов')),
+            ],
+        ),
+        migrations.RunPython(fill_feed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_feedcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('score', models.FloatField(help_text='Логарифм суммы весов комментариев', verbose_name='Оценка')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrendingRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_comment_id', models.PositiveIntegerField(default=0, help_text='Id последнего учтённого комментария', verbose_name='Последний комментарий')),
+                ('finished', models.DateTimeField(null=True, verbose_name='Дата пересчёта')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='trendingpost',
+            index=models.Index(fields=['-score', '-post'], name='trending_score_idx'),
+        ),
+    ]
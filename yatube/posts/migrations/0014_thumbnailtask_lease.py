@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thumbnailtask',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, help_text='До этого момента задачу обрабатывает один из воркеров', null=True, verbose_name='Занята до'),
+        ),
+    ]
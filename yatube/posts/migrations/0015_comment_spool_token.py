@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_thumbnailtask_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='spool_token',
+            field=models.CharField(blank=True, editable=False, help_text='Ключ записи из очереди комментариев', max_length=32, null=True, unique=True, verbose_name='Токен очереди'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_pull_authors(apps, schema_editor):
+    UserStats = apps.get_model('posts', 'UserStats')
+    UserStats.objects.filter(
+        followers_count__gte=settings.FEED_PULL_FOLLOWERS_THRESHOLD
+    ).update(pull_mode=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_comment_spool_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='pull_mode',
+            field=models.BooleanField(default=False, help_text='Посты автора не раскладываются по лентам подписчиков', verbose_name='Читается при запросе'),
+        ),
+        migrations.RunPython(mark_pull_authors, migrations.RunPython.noop),
+    ]
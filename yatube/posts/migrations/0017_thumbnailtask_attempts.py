@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_userstats_pull_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thumbnailtask',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Сколько раз воркер брал задачу', verbose_name='Попыток'),
+        ),
+    ]
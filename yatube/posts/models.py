@@ -26,6 +26,12 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Подтягивает автора и группу одним запросом для карточек постов."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -57,9 +63,25 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Комментариев',
+        help_text='Число комментариев к посту',
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -95,8 +117,22 @@ class Comment(models.Model):
         help_text='Добавьте дату комментария'
     )
 
+    spool_token = models.CharField(
+        max_length=32,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Токен очереди',
+        help_text='Ключ записи из очереди комментариев',
+    )
+
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', '-created', '-id'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text
@@ -123,6 +159,175 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique appversion')
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
 
     def __str__(self):
         return self.author
+
+
+class UserStats(models.Model):
+    """Счётчики автора, обновляемые при записи, а не при показе страниц."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Постов',
+        help_text='Число постов автора',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Подписчиков',
+        help_text='Число подписчиков автора',
+    )
+    pull_mode = models.BooleanField(
+        default=False,
+        verbose_name='Читается при запросе',
+        help_text='Посты автора не раскладываются по лентам подписчиков',
+    )
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class FeedCounter(models.Model):
+    """Число постов в общей ленте или ленте группы для пагинатора."""
+    feed = models.CharField(
+        max_length=64,
+        primary_key=True,
+        verbose_name='Лента',
+        help_text='Имя ленты: index или group:<id>',
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Постов',
+        help_text='Число постов в ленте',
+    )
+
+    def __str__(self):
+        return self.feed
+
+
+class TimelineEntry(models.Model):
+    """Запись персональной ленты подписчика, раскладывается при публикации."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подпищик',
+        help_text='Владелец ленты',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+        help_text='Пост в ленте',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+        help_text='Автор поста',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+        help_text='Копия даты публикации поста',
+    )
+
+    class Meta:
+        ordering = ['-pub_date', '-post_id']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique timeline entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_pub_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class ThumbnailTask(models.Model):
+    """Картинка, для которой воркер ещё не подготовил миниатюры."""
+    image = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Картинка',
+        help_text='Путь к картинке в хранилище',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата постановки в очередь',
+    )
+    leased_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Занята до',
+        help_text='До этого момента задачу обрабатывает один из воркеров',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток',
+        help_text='Сколько раз воркер брал задачу',
+    )
+
+    def __str__(self):
+        return self.image
+
+
+class TrendingPost(models.Model):
+    """Место поста в рейтинге популярных, пересчитываемом по расписанию.
+
+    score — log2 суммы весов комментариев, где вес удваивается каждые
+    TRENDING_HALF_LIFE секунд: свежие комментарии весят больше старых,
+    а старые оценки не нужно пересчитывать при каждом обновлении.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Пост',
+    )
+    score = models.FloatField(
+        verbose_name='Оценка',
+        help_text='Логарифм суммы весов комментариев',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score', '-post'],
+                         name='trending_score_idx'),
+        ]
+
+    def __str__(self):
+        return str(self.post_id)
+
+
+class TrendingRun(models.Model):
+    """Докуда обработаны комментарии при последнем пересчёте рейтинга."""
+    last_comment_id = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Последний комментарий',
+        help_text='Id последнего учтённого комментария',
+    )
+    finished = models.DateTimeField(
+        null=True,
+        verbose_name='Дата пересчёта',
+    )
+
+    def __str__(self):
+        return str(self.last_comment_id)
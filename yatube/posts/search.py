@@ -0,0 +1,173 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+
+FTS_TRIGGERS = {
+    'posts_post_fts_insert': (
+        'AFTER INSERT ON posts_post BEGIN '
+        'INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); '
+        'END'
+    ),
+    'posts_post_fts_delete': (
+        'AFTER DELETE ON posts_post BEGIN '
+        "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+        "VALUES ('delete', old.id, old.text); "
+        'END'
+    ),
+    'posts_post_fts_update': (
+        'AFTER UPDATE OF text ON posts_post BEGIN '
+        "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+        "VALUES ('delete', old.id, old.text); "
+        'INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); '
+        'END'
+    ),
+}
+
+
+def fts_enabled(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def install_fts(using=connection):
+    """Создаёт индекс FTS5 и триггеры, если их нет.
+
+    SQLite пересоздаёт таблицу posts_post при изменении её схемы и теряет
+    триггеры, поэтому установка повторяется после каждой миграции.
+    Если чего-то не хватало, индекс перестраивается целиком.
+    """
+    if not fts_enabled(using):
+        return
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE name = %s OR name LIKE 'posts_post_fts_%%'",
+            [FTS_TABLE],
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [
+            name for name in (FTS_TABLE, *FTS_TRIGGERS)
+            if name not in existing
+        ]
+        if not missing:
+            return
+        if FTS_TABLE not in existing:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+                "text, content='posts_post', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+        for name, body in FTS_TRIGGERS.items():
+            if name not in existing:
+                cursor.execute(f'CREATE TRIGGER {name} {body}')
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+
+
+def uninstall_fts(using=connection):
+    if not fts_enabled(using):
+        return
+    with using.cursor() as cursor:
+        for name in FTS_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def match_expression(query):
+    """Переводит пользовательский запрос в выражение MATCH.
+
+    Каждое слово берётся в кавычки и ищется по префиксу, так что
+    операторы и спецсимволы FTS5 из запроса не интерпретируются.
+    """
+    terms = re.findall(r'\w+', query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def matching_ids_sql(limit=None):
+    """Подзапрос с id совпадений, начиная с самых свежих."""
+    sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+    if limit is not None:
+        sql += f' ORDER BY rowid DESC LIMIT {int(limit)}'
+    return sql
+
+
+class SearchResults:
+    """Результаты поиска, упорядоченные по релевантности (bm25).
+
+    Ранжируются не более SEARCH_MAX_RESULTS самых свежих совпадений:
+    так стоимость запроса не растёт вместе с числом подходящих записей.
+    Поддерживает count() и срезы, поэтому подходит для Paginator.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.match = match_expression(query)
+
+    def count(self):
+        if not self.match:
+            return 0
+        if not fts_enabled():
+            return self._fallback().count()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT count(*) FROM ({})'.format(
+                    matching_ids_sql(settings.SEARCH_MAX_RESULTS)
+                ),
+                [self.match],
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.match:
+            return []
+        if not fts_enabled():
+            return list(self._fallback()[index])
+        start = index.start or 0
+        limit = -1 if index.stop is None else max(index.stop - start, 0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM ('
+                f'SELECT rowid, rank FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rowid DESC '
+                f'LIMIT {int(settings.SEARCH_MAX_RESULTS)}'
+                f') ORDER BY rank LIMIT %s OFFSET %s',
+                [self.match, limit, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+    def _fallback(self):
+        return filter_posts(Post.objects.for_feed(), self.query)
+
+
+def filter_posts(queryset, query):
+    """Оставляет в queryset записи, найденные по запросу."""
+    match = match_expression(query)
+    if not match:
+        return queryset
+    if not fts_enabled():
+        for term in re.findall(r'\w+', query):
+            queryset = queryset.filter(text__icontains=term)
+        return queryset
+    # RawSQL в pk__in дал бы IN ((SELECT ...)), а SQLite считает такой
+    # подзапрос скалярным и возвращает только первую строку.
+    table = connection.ops.quote_name(queryset.model._meta.db_table)
+    return queryset.annotate(search_match=RawSQL(
+        f'{table}."id" IN ({matching_ids_sql()})',
+        [match],
+        output_field=BooleanField(),
+    )).filter(search_match=True)
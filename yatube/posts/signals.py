@@ -0,0 +1,85 @@
+from django.db import connections
+from django.db.models.signals import (post_delete, post_init, post_migrate,
+                                      post_save)
+from django.dispatch import receiver
+
+from . import cache, counters, follows, search, thumbnails, timeline
+from .models import Comment, Follow, Post
+
+
+@receiver(post_init, sender=Post)
+def remember_loaded_state(sender, instance, **kwargs):
+    # Отложенные через only()/defer() поля не читаются, чтобы не вызвать
+    # лишний запрос на каждый загруженный пост.
+    state = instance.__dict__
+    instance._loaded_group_id = state.get('group_id')
+    instance._loaded_image = str(state.get('image') or '')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    old_group_id = None if created else instance._loaded_group_id
+    cache.bump_generation(
+        *cache.post_feeds(instance, instance._loaded_group_id)
+    )
+    instance._loaded_group_id = instance.group_id
+    if old_group_id != instance.group_id:
+        if old_group_id is not None:
+            counters.change_feed_count(cache.group_feed(old_group_id), -1)
+        if instance.group_id is not None:
+            counters.change_feed_count(cache.group_feed(instance.group_id), 1)
+    if instance.image and (
+            created or instance.image.name != instance._loaded_image):
+        thumbnails.schedule(instance.image.name)
+    instance._loaded_image = instance.image.name
+    if created:
+        counters.change_user_counter(instance.author_id, 'posts_count', 1)
+        counters.change_feed_count(cache.index_feed(), 1)
+        timeline.push_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    cache.bump_generation(*cache.post_feeds(instance))
+    counters.change_user_counter(instance.author_id, 'posts_count', -1)
+    counters.change_feed_count(cache.index_feed(), -1)
+    if instance.group_id is not None:
+        counters.change_feed_count(cache.group_feed(instance.group_id), -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        follows.forget(instance.user_id)
+        counters.change_user_counter(
+            instance.author_id, 'followers_count', 1
+        )
+        timeline.enter_pull_mode(instance.author_id)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    follows.forget(instance.user_id)
+    counters.change_user_counter(instance.author_id, 'followers_count', -1)
+    timeline.trim(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_migrate)
+def restore_search_index(sender, using, **kwargs):
+    # Перестройка таблицы posts_post в SQLite удаляет триггеры FTS5.
+    connection = connections[using]
+    if (sender.name == 'posts'
+            and Post._meta.db_table in connection.introspection.table_names()):
+        search.install_fts(connection)
@@ -0,0 +1,118 @@
+from collections import namedtuple
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+
+from .models import Group, Post
+
+User = get_user_model()
+
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+CACHE_KEY = 'sitemap:{}:{}:{}'
+CHUNK_SIZE = 5000
+
+Section = namedtuple('Section', 'queryset fields location lastmod')
+
+# Каждый раздел делится на шарды по диапазонам id: шард n содержит
+# объекты с id от (n - 1) * SITEMAP_SHARD_SIZE + 1 до n * SITEMAP_SHARD_SIZE.
+# Номер шарда объекта не меняется, и шарды строятся независимо.
+SECTIONS = {
+    'posts': Section(
+        Post.objects.all,
+        ('pk', 'pub_date'),
+        lambda pk, pub_date: reverse('posts:post_detail', args=[pk]),
+        lambda pk, pub_date: pub_date,
+    ),
+    'groups': Section(
+        Group.objects.all,
+        ('pk', 'slug'),
+        lambda pk, slug: reverse('posts:group_list', args=[slug]),
+        None,
+    ),
+    'profiles': Section(
+        lambda: User.objects.filter(stats__posts_count__gt=0),
+        ('pk', 'username'),
+        lambda pk, username: reverse('posts:profile', args=[username]),
+        None,
+    ),
+}
+
+
+def shard_count(section):
+    """Число шардов раздела по наибольшему id, без подсчёта строк."""
+    top = SECTIONS[section].queryset().aggregate(top=Max('pk'))['top']
+    return -(-(top or 0) // settings.SITEMAP_SHARD_SIZE)
+
+
+def shard_rows(section, number):
+    """Строки шарда пачками по CHUNK_SIZE по возрастанию id."""
+    queryset, fields, *_ = SECTIONS[section]
+    last_pk = (number - 1) * settings.SITEMAP_SHARD_SIZE
+    end = number * settings.SITEMAP_SHARD_SIZE
+    rows = queryset().filter(pk__lte=end).order_by('pk').values_list(*fields)
+    while True:
+        chunk = list(rows.filter(pk__gt=last_pk)[:CHUNK_SIZE])
+        if not chunk:
+            return
+        yield from chunk
+        last_pk = chunk[-1][0]
+
+
+def shard_url(section, number):
+    return reverse('posts:sitemap_shard', args=[section, number])
+
+
+def render_index(base_url):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<sitemapindex xmlns="{XMLNS}">\n'
+    for section in SECTIONS:
+        for number in range(1, shard_count(section) + 1):
+            location = escape(base_url + shard_url(section, number))
+            yield f'<sitemap><loc>{location}</loc></sitemap>\n'
+    yield '</sitemapindex>\n'
+
+
+def render_shard(base_url, section, number):
+    _, _, location, lastmod = SECTIONS[section]
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<urlset xmlns="{XMLNS}">\n'
+    for row in shard_rows(section, number):
+        url = f'<url><loc>{escape(base_url + location(*row))}</loc>'
+        if lastmod is not None:
+            url += f'<lastmod>{lastmod(*row).date().isoformat()}</lastmod>'
+        yield url + '</url>\n'
+    yield '</urlset>\n'
+
+
+def _cached(base_url, name, render):
+    return cache.get_or_set(
+        CACHE_KEY.format(base_url, name, settings.SITEMAP_SHARD_SIZE),
+        lambda: ''.join(render()),
+        settings.SITEMAP_CACHE_TIMEOUT,
+    )
+
+
+def _base_url(request):
+    return request.build_absolute_uri('/').rstrip('/')
+
+
+def sitemap_index(request):
+    base_url = _base_url(request)
+    content = _cached(base_url, 'index', lambda: render_index(base_url))
+    return HttpResponse(content, content_type='application/xml')
+
+
+def sitemap_shard(request, section, number):
+    if section not in SECTIONS or not 1 <= number <= shard_count(section):
+        raise Http404
+    base_url = _base_url(request)
+    content = _cached(
+        base_url, f'{section}-{number}',
+        lambda: render_shard(base_url, section, number),
+    )
+    return HttpResponse(content, content_type='application/xml')
@@ -0,0 +1,205 @@
+import json
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters
+from .models import Comment, Post, User
+from .utilites import explicit_dates
+
+PENDING_KEY = 'pending_comments:{}:{}'
+LOCK_SUFFIX = ':lock'
+LOCK_POLL = 0.005
+CLAIMED_DIR = 'claimed'
+
+
+def _path(*parts):
+    return os.path.join(settings.COMMENT_SPOOL_DIR, *parts)
+
+
+def _write(path, entry):
+    """Пишет файл целиком через временный и fsync: он либо есть, либо нет."""
+    directory, name = os.path.split(path)
+    temporary = os.path.join(directory, f'.{name}')
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(entry, file, ensure_ascii=False)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def _cache():
+    return caches[settings.COMMENT_PENDING_CACHE]
+
+
+@contextmanager
+def _locked(key):
+    """Чтение и запись оверлея под блокировкой через атомарный cache.add().
+
+    Иначе два комментария одного автора к посту, пришедшие в разные
+    воркеры, перезапишут оверлей друг друга. Блокировка живёт секунду,
+    поэтому упавший владелец не держит её дольше.
+    """
+    while not _cache().add(key + LOCK_SUFFIX, True, 1):
+        time.sleep(LOCK_POLL)
+    try:
+        yield
+    finally:
+        _cache().delete(key + LOCK_SUFFIX)
+
+
+def enqueue(post, author, text):
+    """Ставит комментарий в очередь на диске вместо INSERT в базу.
+
+    Пока комментарий не записан в базу, автор видит его через оверлей
+    в кэше (pending_comments).
+    """
+    entry = {
+        'token': uuid4().hex,
+        'post_id': post.pk,
+        'author_id': author.pk,
+        'text': text,
+        'created': timezone.now().isoformat(),
+    }
+    os.makedirs(_path(), exist_ok=True)
+    # Время в имени сохраняет порядок комментариев при записи в базу.
+    _write(_path(f'{time.time_ns()}-{entry["token"]}.json'), entry)
+    key = PENDING_KEY.format(post.pk, author.pk)
+    with _locked(key):
+        pending = _cache().get(key) or {}
+        pending[entry['token']] = entry
+        _cache().set(key, pending, settings.COMMENT_PENDING_TIMEOUT)
+    return entry
+
+
+def pending_comments(post, user):
+    """Ещё не записанные в базу комментарии user к post, новые первыми."""
+    if not user.is_authenticated:
+        return []
+    pending = _cache().get(PENDING_KEY.format(post.pk, user.pk)) or {}
+    return [
+        Comment(
+            post=post,
+            author=user,
+            text=entry['text'],
+            created=parse_datetime(entry['created']),
+        )
+        for entry in sorted(
+            pending.values(), key=lambda entry: entry['created'],
+            reverse=True,
+        )
+    ]
+
+
+def recover():
+    """Возвращает в очередь файлы, взятые упавшим сборщиком."""
+    claimed = _path(CLAIMED_DIR)
+    if not os.path.isdir(claimed):
+        return 0
+    names = os.listdir(claimed)
+    for name in names:
+        os.replace(os.path.join(claimed, name), _path(name))
+    return len(names)
+
+
+def claim(limit):
+    """Забирает из очереди до limit самых старых файлов.
+
+    Файл переносится в claimed/ одним rename, поэтому его не заберёт
+    второй сборщик и не потеряет упавший: recover() вернёт его обратно.
+    """
+    if not os.path.isdir(_path()):
+        return []
+    os.makedirs(_path(CLAIMED_DIR), exist_ok=True)
+    names = sorted(
+        name for name in os.listdir(_path())
+        if name.endswith('.json') and not name.startswith('.')
+    )
+    claimed = []
+    for name in names[:limit]:
+        path = _path(CLAIMED_DIR, name)
+        try:
+            os.rename(_path(name), path)
+        except FileNotFoundError:
+            continue
+        claimed.append(path)
+    return claimed
+
+
+def _forget_pending(entries):
+    tokens = {}
+    for entry in entries:
+        key = PENDING_KEY.format(entry['post_id'], entry['author_id'])
+        tokens.setdefault(key, set()).add(entry['token'])
+    for key, flushed in tokens.items():
+        with _locked(key):
+            pending = _cache().get(key) or {}
+            for token in flushed:
+                pending.pop(token, None)
+            if pending:
+                _cache().set(key, pending, settings.COMMENT_PENDING_TIMEOUT)
+            else:
+                _cache().delete(key)
+
+
+def flush(batch_size):
+    """Записывает пачку комментариев из очереди одним bulk_create.
+
+    Файлы удаляются после фиксации транзакции. Если сборщик упал между
+    ними, пачка запишется снова, но токен записи уникален, и повтор
+    не создаёт дублей и не сдвигает счётчики. Комментарии к удалённым
+    постам и от удалённых пользователей отбрасываются.
+    Возвращает число обработанных файлов.
+    """
+    paths = claim(batch_size)
+    if not paths:
+        return 0
+    entries = []
+    for path in paths:
+        with open(path, encoding='utf-8') as file:
+            entries.append(json.load(file))
+    posts = set(Post.objects.filter(
+        pk__in={entry['post_id'] for entry in entries}
+    ).values_list('pk', flat=True))
+    users = set(User.objects.filter(
+        pk__in={entry['author_id'] for entry in entries}
+    ).values_list('pk', flat=True))
+    entries = [
+        entry for entry in entries
+        if entry['post_id'] in posts and entry['author_id'] in users
+    ]
+    flushed = Comment.objects.filter(
+        spool_token__in=[entry['token'] for entry in entries]
+    ).values_list('post_id', flat=True)
+    with transaction.atomic():
+        before = Counter(flushed.all())
+        with explicit_dates(Comment._meta.get_field('created')):
+            Comment.objects.bulk_create(
+                (
+                    Comment(
+                        post_id=entry['post_id'],
+                        author_id=entry['author_id'],
+                        text=entry['text'],
+                        created=parse_datetime(entry['created']),
+                        spool_token=entry['token'],
+                    )
+                    for entry in entries
+                ),
+                ignore_conflicts=True,
+            )
+        # bulk_create не отправляет post_save, счётчики сдвигаются здесь
+        # на число действительно вставленных строк.
+        for post_id, added in (Counter(flushed.all()) - before).items():
+            counters.change_comments_count(post_id, added)
+    for path in paths:
+        os.remove(path)
+    _forget_pending(entries)
+    return len(paths)
@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..benchmarks import compare, percentile
+from ..cache import get_generation, index_feed
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def report(**views):
+    return {'results': {'100': views}}
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        Post.objects.create(author=cls.author, group=cls.group, text='Пост')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.99), 7)
+
+    def test_compare_flags_slower_views_and_extra_queries(self):
+        baseline = report(
+            index={'p50_ms': 10, 'queries': 2},
+            profile={'p50_ms': 10, 'queries': 2},
+        )
+        current = report(
+            index={'p50_ms': 11, 'queries': 2},
+            profile={'p50_ms': 13, 'queries': 3},
+            follow_index={'p50_ms': 50, 'queries': 9},
+        )
+        self.assertEqual(len(compare(baseline, current, 0.2)), 2)
+        self.assertEqual(compare(baseline, current, 0.5), [
+            '100/profile: запросов 2 → 3'
+        ])
+
+    def test_command_writes_report(self):
+        call_command(
+            'benchmark', repeat=3, output=self.path('report.json'),
+            stdout=StringIO(),
+        )
+        with open(self.path('report.json'), encoding='utf-8') as file:
+            data = json.load(file)
+        [views] = data['results'].values()
+        self.assertEqual(set(views), {
+            'index', 'group_posts', 'profile', 'post_detail',
+            'follow_index', 'post_create', 'add_comment',
+        })
+        for name, metrics in views.items():
+            with self.subTest(view=name):
+                self.assertLessEqual(metrics['p50_ms'], metrics['p99_ms'])
+                self.assertGreater(metrics['queries'], 0)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_command_leaves_site_cache_alone(self):
+        cache.set('site-key', 'value')
+        generation = get_generation(index_feed())
+        call_command('benchmark', repeat=1, cold=True, stdout=StringIO())
+        self.assertEqual(cache.get('site-key'), 'value')
+        self.assertEqual(get_generation(index_feed()), generation)
+
+    def test_compare_mode_fails_on_regression(self):
+        for name, data in (
+            ('old.json', report(index={'p50_ms': 10, 'queries': 1})),
+            ('new.json', report(index={'p50_ms': 30, 'queries': 1})),
+        ):
+            with open(self.path(name), 'w', encoding='utf-8') as file:
+                json.dump(data, file)
+        with self.assertRaises(CommandError):
+            call_command(
+                'benchmark',
+                compare=[self.path('old.json'), self.path('new.json')],
+                stdout=StringIO(), stderr=StringIO(),
+            )
+        call_command(
+            'benchmark',
+            compare=[self.path('old.json'), self.path('new.json')],
+            threshold=5, stdout=StringIO(),
+        )
@@ -0,0 +1,103 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..cache import group_feed, index_feed
+from ..models import Comment, FeedCounter, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self) -> None:
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_posts_count_follows_create_and_delete(self):
+        post = Post.objects.create(author=self.author, text='Ещё пост')
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+    def test_followers_count_follows_subscriptions(self):
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+
+    def test_comments_count_follows_comments(self):
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            data={'text': 'Комментарий'},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.feed_count(index_feed()), 1)
+        Comment.objects.get(post=self.post).delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    @override_settings(PAGINATION_MODE='cursor')
+    def test_pages_do_not_count_rows(self):
+        for address in (
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ):
+            with self.subTest(address=address):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client.get(address)
+                self.assertContains(response, 'Всего постов')
+                self.assertFalse(any(
+                    'COUNT(' in query['sql'] for query in queries
+                ))
+
+    def feed_count(self, feed):
+        return FeedCounter.objects.get(feed=feed).count
+
+    def test_feed_counts_follow_posts_and_groups(self):
+        first = Group.objects.create(title='Первая', slug='first')
+        second = Group.objects.create(title='Вторая', slug='second')
+        post = Post.objects.create(
+            author=self.author, text='В группе', group=first
+        )
+        self.assertEqual(self.feed_count(index_feed()), 2)
+        self.assertEqual(self.feed_count(group_feed(first.pk)), 1)
+        post.group = second
+        post.save()
+        self.assertEqual(self.feed_count(group_feed(first.pk)), 0)
+        self.assertEqual(self.feed_count(group_feed(second.pk)), 1)
+        post.delete()
+        self.assertEqual(self.feed_count(index_feed()), 1)
+        self.assertEqual(self.feed_count(group_feed(second.pk)), 0)
+
+    def test_repair_counters_command(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        Comment.objects.create(post=self.post, author=self.user, text='Т')
+        UserStats.objects.all().update(posts_count=10, followers_count=10)
+        Post.objects.update(comments_count=10)
+        FeedCounter.objects.update(count=10)
+        call_command('repair_counters', chunk_size=1, stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.feed_count(index_feed()), 1)
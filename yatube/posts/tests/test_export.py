@@ -0,0 +1,88 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..export import chunks, stream
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_chunks_use_keyset_queries(self):
+        with self.assertNumQueries(4):
+            sizes = [len(rows) for rows in chunks('posts', 2)]
+        self.assertEqual(sizes, [2, 2, 1])
+
+    def test_ndjson_rows(self):
+        lines = b''.join(stream('posts', chunk_size=2)).decode().splitlines()
+        first = json.loads(lines[0])
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(first['id'], self.posts[0].pk)
+        self.assertEqual(first['author'], 'author')
+        self.assertEqual(first['group'], 'group')
+        self.assertEqual(first['text'], 'Пост 0')
+
+    def test_gzip_csv(self):
+        data = gzip.decompress(b''.join(
+            stream('follows', 'csv', compress=True, chunk_size=1)
+        )).decode()
+        self.assertEqual(list(csv.reader(StringIO(data))), [
+            ['id', 'user', 'author'],
+            [str(Follow.objects.get().pk), 'reader', 'author'],
+        ])
+
+    def test_command_writes_file_per_table(self):
+        call_command(
+            'export', format='csv', gzip=True,
+            output_dir=self.output_dir, stdout=StringIO(),
+        )
+        self.assertEqual(sorted(os.listdir(self.output_dir)), [
+            'comments.csv.gz', 'follows.csv.gz',
+            'groups.csv.gz', 'posts.csv.gz',
+        ])
+        call_command(
+            'export', 'comments', output_dir=self.output_dir,
+            stdout=StringIO(),
+        )
+        path = os.path.join(self.output_dir, 'comments.ndjson')
+        with open(path, encoding='utf-8') as file:
+            comment = json.loads(file.read())
+        self.assertEqual(comment['post'], self.posts[0].pk)
+        self.assertEqual(comment['author'], 'reader')
+        with self.assertRaises(CommandError):
+            call_command('export', 'users', stdout=StringIO())
@@ -0,0 +1,93 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class SyndicationFeedsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост в группе'
+        )
+        cls.urls = (
+            reverse('posts:index_feed', args=['rss']),
+            reverse('posts:group_feed', args=['group', 'atom']),
+            reverse('posts:profile_feed', args=['author', 'rss']),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_contain_posts(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, 'Пост в группе')
+                self.assertContains(response, reverse(
+                    'posts:post_detail', args=[self.post.pk]
+                ))
+        response = self.client.get(self.urls[1])
+        self.assertTrue(response['Content-Type'].startswith(
+            'application/atom+xml'
+        ))
+
+    def test_unknown_feeds(self):
+        for url in (
+            reverse('posts:index_feed', args=['json']),
+            reverse('posts:group_feed', args=['missing', 'rss']),
+            reverse('posts:profile_feed', args=['missing', 'rss']),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.client.get(url).status_code, HTTPStatus.NOT_FOUND
+                )
+
+    def test_conditional_get_skips_posts(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('Last-Modified', response)
+                with CaptureQueriesContext(connection) as queries:
+                    not_modified = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(
+                    not_modified.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                self.assertFalse(any(
+                    'posts_post' in query['sql'] for query in queries
+                ))
+                self.assertEqual(
+                    self.client.get(
+                        url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                    ).status_code,
+                    HTTPStatus.NOT_MODIFIED,
+                )
+
+    def test_new_post_changes_feed(self):
+        for url in self.urls:
+            self.client.get(url)
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        Post.objects.create(
+            author=self.author, group=self.group, text='Свежий пост'
+        )
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, 'Свежий пост')
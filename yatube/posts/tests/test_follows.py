@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..follows import follow, following_ids, is_following, unfollow
+from ..models import Follow, UserStats
+
+User = get_user_model()
+
+
+class FollowServiceTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_follow_and_unfollow(self):
+        author = self.authors[0]
+        self.assertTrue(follow(self.user, author))
+        self.assertFalse(follow(self.user, author))
+        self.assertFalse(follow(self.user, self.user))
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(
+            UserStats.objects.get(user=author).followers_count, 1
+        )
+        self.assertTrue(unfollow(self.user, author))
+        self.assertFalse(unfollow(self.user, author))
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(
+            UserStats.objects.get(user=author).followers_count, 0
+        )
+
+    def follow_statements(self, queries):
+        return [
+            query['sql'].split()[0] for query in queries
+            if 'posts_follow' in query['sql']
+        ]
+
+    def test_follow_does_not_read_before_writing(self):
+        author = self.authors[0]
+        with CaptureQueriesContext(connection) as queries:
+            follow(self.user, author)
+        self.assertEqual(self.follow_statements(queries)[0], 'INSERT')
+        with CaptureQueriesContext(connection) as queries:
+            follow(self.user, author)
+        self.assertEqual(self.follow_statements(queries), ['INSERT'])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(unfollow(self.user, author))
+        self.assertEqual(
+            self.follow_statements(queries)[:2], ['SELECT', 'DELETE']
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(unfollow(self.user, author))
+        self.assertEqual(self.follow_statements(queries), ['SELECT'])
+
+    def test_is_following_batch_is_cached(self):
+        follow(self.user, self.authors[0])
+        follow(self.user, self.authors[2].pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                is_following(self.user, self.authors),
+                {self.authors[0].pk, self.authors[2].pk},
+            )
+        with self.assertNumQueries(0):
+            is_following(self.user, self.authors)
+        self.assertEqual(is_following(AnonymousUser(), self.authors), set())
+
+    def test_cache_is_reset_on_changes(self):
+        self.assertEqual(following_ids(self.user), set())
+        Follow.objects.create(user=self.user, author=self.authors[1])
+        self.assertEqual(following_ids(self.user), {self.authors[1].pk})
+        unfollow(self.user, self.authors[1])
+        self.assertEqual(following_ids(self.user), set())
+
+    def test_profile_follow_views(self):
+        author = self.authors[0]
+        profile = reverse('posts:profile', args=[author.username])
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=[author.username])
+        )
+        response = self.authorized_client.get(profile)
+        self.assertTrue(response.context['following'])
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=[author.username])
+        )
+        response = self.authorized_client.get(profile)
+        self.assertFalse(response.context['following'])
@@ -1,12 +1,16 @@
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
 
+from ..images import IMAGE_INFO
 from ..models import Comment, Post, User
 
 User = get_user_model()
@@ -134,3 +138,98 @@ class PostCreateFormTests(TestCase):
             follow=True,
         )
         self.assertEqual(Comment.objects.count(), comment_count)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POST_IMAGE_MAX_EDGE=40,
+    POST_IMAGE_MAX_PIXELS=200 * 200,
+)
+class PostImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self) -> None:
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self, name, size, image_format, **save_options):
+        buffer = BytesIO()
+        Image.new('RGB', size, color=(200, 0, 0)).save(
+            buffer, image_format, **save_options
+        )
+        return SimpleUploadedFile(name=name, content=buffer.getvalue())
+
+    def create_post(self, image):
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': image},
+        )
+
+    def test_large_image_is_downscaled_without_metadata(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        self.create_post(
+            self.upload('big.jpg', (160, 80), 'JPEG', exif=exif.tobytes())
+        )
+        post = Post.objects.get(text='Пост с картинкой')
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (40, 20))
+            self.assertNotIn('exif', image.info)
+
+    def test_small_image_is_stored_as_is(self):
+        self.create_post(self.upload('small.png', (30, 10), 'PNG'))
+        post = Post.objects.get(text='Пост с картинкой')
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (30, 10))
+
+    def test_animated_image_is_downscaled_by_frame(self):
+        frames = [
+            Image.new('RGB', (160, 80), color)
+            for color in ((200, 0, 0), (0, 200, 0), (0, 0, 200))
+        ]
+        buffer = BytesIO()
+        frames[0].save(
+            buffer, 'GIF', save_all=True, append_images=frames[1:],
+            duration=120, loop=0,
+        )
+        self.create_post(
+            SimpleUploadedFile(name='anim.gif', content=buffer.getvalue())
+        )
+        post = Post.objects.get(text='Пост с картинкой')
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (40, 20))
+            self.assertEqual(image.n_frames, 3)
+            self.assertEqual(image.info['duration'], 120)
+
+    def test_small_image_metadata_is_stripped(self):
+        text = PngInfo()
+        text.add_text('Comment', 'Секрет')
+        text.add_itxt('XML:com.adobe.xmp', '<x:xmpmeta/>')
+        self.create_post(self.upload(
+            'small.png', (30, 10), 'PNG',
+            pnginfo=text, icc_profile=b'profile',
+        ))
+        post = Post.objects.get(text='Пост с картинкой')
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (30, 10))
+            self.assertEqual(set(image.info) - IMAGE_INFO, set())
+
+    def test_image_limits_are_checked(self):
+        cases = (
+            ('huge.png', (300, 300), {}),
+            ('heavy.png', (30, 10), {'POST_IMAGE_MAX_BYTES': 10}),
+        )
+        for name, size, limits in cases:
+            with self.subTest(name=name), self.settings(**limits):
+                response = self.create_post(self.upload(name, size, 'PNG'))
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from ..counters import repair_comment_counts, repair_user_stats
+from ..models import Comment, Follow, Group, Post, ThumbnailTask, TimelineEntry
+from ..timeline import backfill
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateDataTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def generate(self, **options):
+        options = {
+            'users': 30, 'groups': 3, 'posts': 200, 'comments': 100,
+            'follows': 5, 'seed': 1, 'batch_size': 50, **options,
+        }
+        call_command('generate_data', stdout=StringIO(), **options)
+
+    def test_creates_requested_amounts(self):
+        self.generate()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(
+            Follow.objects.filter(user_id=F('author_id')).exists()
+        )
+
+    def test_derived_data_is_consistent(self):
+        self.generate()
+        self.assertEqual(repair_user_stats(), 0)
+        self.assertEqual(repair_comment_counts(), 0)
+        entries = set(TimelineEntry.objects.values_list(
+            'user_id', 'post_id', 'author_id', 'pub_date'
+        ))
+        TimelineEntry.objects.all().delete()
+        for user_id, author_id in Follow.objects.values_list(
+                'user_id', 'author_id'):
+            backfill(user_id, author_id)
+        self.assertEqual(entries, set(TimelineEntry.objects.values_list(
+            'user_id', 'post_id', 'author_id', 'pub_date'
+        )))
+
+    def test_posts_are_dated_in_id_order(self):
+        self.generate()
+        dates = list(Post.objects.order_by('pk').values_list(
+            'pub_date', flat=True
+        ))
+        self.assertEqual(dates, sorted(dates))
+        self.assertFalse(Comment.objects.filter(
+            created__lt=F('post__pub_date')
+        ).exists())
+
+    def test_same_seed_gives_same_data(self):
+        self.generate(prefix='first')
+        self.generate(prefix='second')
+        first, second = (
+            list(Post.objects.filter(
+                author__username__startswith=prefix
+            ).order_by('pk').values_list('text', 'comments_count'))
+            for prefix in ('first', 'second')
+        )
+        self.assertEqual(first, second)
+        self.assertEqual(User.objects.count(), 60)
+
+    def test_images_are_shared_and_queued(self):
+        self.generate(images=1)
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertLessEqual(len(names), 16)
+        self.assertEqual(
+            set(ThumbnailTask.objects.values_list('image', flat=True)),
+            names,
+        )
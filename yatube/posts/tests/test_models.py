@@ -1,7 +1,12 @@
+from datetime import datetime
+from threading import Event, Thread
+
 from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
 
 from ..models import Group, Post
+from ..utilites import explicit_dates
 
 User = get_user_model()
 
@@ -85,3 +90,27 @@ class PostModelTest(TestCase):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value
                 )
+
+
+class ExplicitDatesTest(TestCase):
+    def test_other_threads_keep_auto_now_add(self):
+        field = Post._meta.get_field('pub_date')
+        date = timezone.make_aware(datetime(2000, 1, 1))
+        inside, done = Event(), Event()
+        dates = {}
+
+        def importer():
+            with explicit_dates(field):
+                inside.set()
+                done.wait(5)
+                dates['importer'] = field.pre_save(Post(pub_date=date), True)
+
+        thread = Thread(target=importer)
+        thread.start()
+        inside.wait(5)
+        dates['site'] = field.pre_save(Post(pub_date=date), True)
+        done.set()
+        thread.join()
+        self.assertEqual(dates['importer'], date)
+        self.assertNotEqual(dates['site'], date)
+        self.assertTrue(field.auto_now_add)
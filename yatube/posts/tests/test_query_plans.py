@@ -0,0 +1,136 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, TrendingPost, UserStats
+from ..timeline import TIMELINE_KEYS
+from ..utilites import COMMENT_KEYS, encode_cursor
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(r'\bSCAN (TABLE )?(\w+)$')
+TEMP_SORT = 'USE TEMP B-TREE'
+# Поиск ранжирует не больше SEARCH_MAX_RESULTS строк подзапроса с LIMIT:
+# такую сортировку размер таблиц не увеличивает.
+BOUNDED_SORT = 'SCAN (subquery-'
+# Таблицы, которые растут вместе с сайтом: по ним нельзя сканировать
+# и сортировать во временном дереве.
+LARGE_TABLES = {
+    'auth_user', 'posts_post', 'posts_comment', 'posts_follow',
+    'posts_post_fts', 'posts_timelineentry', 'posts_trendingpost',
+    'posts_userstats',
+}
+LARGE_TABLE = re.compile(r'\b({})\b'.format('|'.join(LARGE_TABLES)))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть в SQLite')
+@override_settings(FEED_PULL_AUTHORS_LIMIT=1, PAGINATION_MODE='offset')
+class QueryPlanTests(TestCase):
+    """SQL, который выполняют страницы, идёт по индексам.
+
+    Запросы снимаются с настоящих ответов представлений, поэтому план
+    проверяется у того SQL, что строят ORM и слияние лент, включая
+    подсчёты для пагинатора и потоки читаемых при запросе авторов.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.pulled = [
+            User.objects.create_user(username=f'pulled{number}')
+            for number in range(2)
+        ]
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for author in (cls.author, *cls.pulled):
+            Follow.objects.create(user=cls.reader, author=author)
+        UserStats.objects.filter(user__in=cls.pulled).update(pull_mode=True)
+        for number in range(12):
+            for author in (cls.author, *cls.pulled):
+                Post.objects.create(
+                    author=author, group=cls.group, text=f'Пост {number}'
+                )
+        cls.post = Post.objects.filter(author=cls.author).latest('pk')
+        for number in range(25):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Текст {number}'
+            )
+        TrendingPost.objects.bulk_create(
+            TrendingPost(post=post, score=post.pk)
+            for post in Post.objects.all()
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def pages(self):
+        post_cursor = encode_cursor(self.post)
+        comment_cursor = encode_cursor(
+            self.post.comments.latest('pk'), COMMENT_KEYS
+        )
+        entry = self.reader.timeline.latest('pk')
+        feeds = {
+            'index': reverse('posts:index'),
+            'group_posts': reverse('posts:group_list', args=['group']),
+            'profile': reverse('posts:profile', args=['author']),
+            'follow_index': reverse('posts:follow_index'),
+        }
+        pages = {}
+        for name, url in feeds.items():
+            pages[f'{name}: offset'] = url + '?page=2'
+            pages[f'{name}: after'] = f'{url}?after={post_cursor}'
+            pages[f'{name}: before'] = f'{url}?before={post_cursor}'
+        pages['follow_index: timeline cursor'] = '{}?after={}'.format(
+            feeds['follow_index'], encode_cursor(entry, TIMELINE_KEYS)
+        )
+        pages['popular'] = reverse('posts:popular') + '?page=2'
+        pages['search'] = reverse('posts:search') + '?q=Пост&page=2'
+        pages['post_detail'] = reverse(
+            'posts:post_detail', args=[self.post.pk]
+        )
+        pages['post_detail: comments cursor'] = '{}?after={}'.format(
+            reverse('posts:post_comments', args=[self.post.pk]),
+            comment_cursor,
+        )
+        return pages
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def captured(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+            and LARGE_TABLE.search(query['sql'])
+        ]
+
+    def test_pages_use_indexes(self):
+        for name, url in self.pages().items():
+            statements = self.captured(url)
+            self.assertTrue(statements, name)
+            for sql in statements:
+                with self.subTest(page=name, sql=sql):
+                    plan = self.explain(sql)
+                    scans = [
+                        match[0] for match in map(FULL_SCAN.search, plan)
+                        if match and match[2] in LARGE_TABLES
+                    ]
+                    self.assertEqual(scans, [], plan)
+                    if not any(BOUNDED_SORT in step for step in plan):
+                        self.assertFalse(
+                            any(TEMP_SORT in step for step in plan), plan
+                        )
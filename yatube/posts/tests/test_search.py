@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..search import SearchResults, install_fts, match_expression
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.apple = Post.objects.create(
+            author=cls.author, text='Яблоки и груши созрели'
+        )
+        cls.apples = Post.objects.create(
+            author=cls.author, text='Яблоки, яблоки, снова яблоки'
+        )
+        cls.pear = Post.objects.create(author=cls.author, text='Груши')
+
+    def setUp(self) -> None:
+        self.guest_client = Client()
+
+    def search(self, query):
+        return [post.pk for post in SearchResults(query)[:10]]
+
+    def test_match_expression_quotes_terms(self):
+        for query, expected in (
+            ('яблоки груши', '"яблоки"* "груши"*'),
+            ('"NEAR(a b)" OR -c*', '"NEAR"* "a"* "b"* "OR"* "c"*'),
+            ('  ', ''),
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(match_expression(query), expected)
+
+    def test_results_are_ranked(self):
+        self.assertEqual(
+            self.search('яблоки'), [self.apples.pk, self.apple.pk]
+        )
+        self.assertEqual(SearchResults('яблоки').count(), 2)
+
+    def test_prefix_and_case_insensitive(self):
+        self.assertEqual(
+            set(self.search('ГРУШ')), {self.apple.pk, self.pear.pk}
+        )
+        self.assertEqual(self.search('яблоки груши'), [self.apple.pk])
+
+    def test_index_follows_post_writes(self):
+        post = Post.objects.create(author=self.author, text='Сливы')
+        self.assertEqual(self.search('сливы'), [post.pk])
+        post.text = 'Персики'
+        post.save()
+        self.assertEqual(self.search('сливы'), [])
+        self.assertEqual(self.search('персики'), [post.pk])
+        post.delete()
+        self.assertEqual(self.search('персики'), [])
+
+    def test_index_survives_table_rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER posts_post_fts_insert')
+        install_fts(connection)
+        post = Post.objects.create(author=self.author, text='Вишни')
+        self.assertEqual(self.search('вишни'), [post.pk])
+
+    def test_search_page(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Яблоко {i}')
+            for i in range(settings.PAGE_SIZE)
+        )
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'яблок'}
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj[0], self.apples)
+        self.assertEqual(page_obj.paginator.count, settings.PAGE_SIZE + 2)
+        self.assertContains(response, '?q=%D1%8F%D0%B1%D0%BB%D0%BE%D0%BA')
+
+    def test_feed_paginator_drops_search_query(self):
+        cache.clear()
+        for i in range(settings.PAGE_SIZE):
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+        response = self.guest_client.get(
+            reverse('posts:index'), {'q': 'яблок'}
+        )
+        self.assertContains(response, '?page=2')
+        self.assertNotContains(response, 'q=')
+
+    @override_settings(PAGINATION_MODE='cursor')
+    def test_search_page_ignores_cursor_mode(self):
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'груши'}
+        )
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_empty_query(self):
+        response = self.guest_client.get(reverse('posts:search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_admin_search(self):
+        client = Client()
+        client.force_login(self.admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'сли груш'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), []
+        )
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'груш'}
+        )
+        self.assertEqual(
+            {post.pk for post in response.context['cl'].result_list},
+            {self.apple.pk, self.pear.pk},
+        )
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Group, Post
+from ..sitemaps import shard_count, shard_rows
+
+User = get_user_model()
+
+
+@override_settings(SITEMAP_SHARD_SIZE=2)
+class SitemapTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        User.objects.create_user(username='silent')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {number}')
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_shards_cover_id_ranges(self):
+        last = self.posts[-1].pk
+        self.assertEqual(shard_count('posts'), -(-last // 2))
+        rows = [
+            pk for number in range(1, shard_count('posts') + 1)
+            for pk, _ in shard_rows('posts', number)
+        ]
+        self.assertEqual(rows, [post.pk for post in self.posts])
+
+    def test_index_lists_every_shard(self):
+        response = self.client.get(reverse('posts:sitemap_index'))
+        self.assertEqual(response['Content-Type'], 'application/xml')
+        for section in ('posts', 'groups', 'profiles'):
+            for number in range(1, shard_count(section) + 1):
+                self.assertContains(response, reverse(
+                    'posts:sitemap_shard', args=[section, number]
+                ))
+
+    def test_shard_contents(self):
+        post = self.posts[0]
+        number = -(-post.pk // 2)
+        response = self.client.get(
+            reverse('posts:sitemap_shard', args=['posts', number])
+        )
+        self.assertContains(response, 'http://testserver' + reverse(
+            'posts:post_detail', args=[post.pk]
+        ))
+        self.assertContains(
+            response, f'<lastmod>{post.pub_date.date().isoformat()}'
+        )
+        profiles = b''.join(
+            self.client.get(reverse(
+                'posts:sitemap_shard', args=['profiles', number]
+            )).content
+            for number in range(1, shard_count('profiles') + 1)
+        ).decode()
+        self.assertIn('/profile/author/', profiles)
+        self.assertNotIn('/profile/silent/', profiles)
+        for section, number in (('posts', 100), ('users', 1)):
+            self.assertEqual(
+                self.client.get(reverse(
+                    'posts:sitemap_shard', args=[section, number]
+                )).status_code,
+                HTTPStatus.NOT_FOUND,
+            )
+
+    def test_generate_sitemaps_command(self):
+        output_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, output_dir, ignore_errors=True)
+        call_command(
+            'generate_sitemaps', base_url='https://yatube.example/',
+            output_dir=output_dir, stdout=StringIO(),
+        )
+        files = set(os.listdir(output_dir))
+        self.assertIn('sitemap.xml', files)
+        self.assertIn('sitemap-groups-1.xml', files)
+        self.assertEqual(
+            len([name for name in files if name.startswith('sitemap-posts')]),
+            shard_count('posts'),
+        )
+        with open(os.path.join(output_dir, 'sitemap.xml')) as file:
+            self.assertIn(
+                'https://yatube.example/sitemap-posts-1.xml', file.read()
+            )
@@ -0,0 +1,133 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from threading import Thread
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+
+from ..models import Comment, Post
+from ..spool import (
+    CLAIMED_DIR, claim, enqueue, flush, pending_comments, recover,
+)
+
+User = get_user_model()
+TEMP_SPOOL_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(COMMENT_WRITE_BEHIND=True, COMMENT_SPOOL_DIR=TEMP_SPOOL_DIR)
+class WriteBehindCommentsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_SPOOL_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_SPOOL_DIR, ignore_errors=True)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def comment(self, text, post=None):
+        post = post or self.post
+        return self.author_client.post(
+            reverse('posts:add_comment', args=[post.pk]), {'text': text}
+        )
+
+    def shown_comments(self, client):
+        response = client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        return [comment.text for comment in response.context['comments']]
+
+    def test_comment_is_queued_and_shown_to_its_author(self):
+        self.comment('Первый')
+        self.comment('Второй')
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(
+            self.shown_comments(self.author_client), ['Второй', 'Первый']
+        )
+        self.assertEqual(self.shown_comments(self.reader_client), [])
+
+    def test_concurrent_comments_keep_each_other_in_overlay(self):
+        def worker(number):
+            for index in range(5):
+                enqueue(self.post, self.author, f'{number}-{index}')
+
+        threads = [Thread(target=worker, args=(n,)) for n in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(pending_comments(self.post, self.author)), 30)
+        flush(100)
+        self.assertEqual(pending_comments(self.post, self.author), [])
+
+    def test_flush_writes_batches(self):
+        for number in range(3):
+            self.comment(f'Комментарий {number}')
+        self.assertEqual(flush(2), 2)
+        self.assertEqual(flush(2), 1)
+        self.assertEqual(flush(2), 0)
+        self.assertEqual(
+            list(Comment.objects.order_by('pk').values_list(
+                'text', flat=True
+            )),
+            ['Комментарий 0', 'Комментарий 1', 'Комментарий 2'],
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 3)
+        self.assertEqual(len(self.shown_comments(self.author_client)), 3)
+        self.assertEqual(len(self.shown_comments(self.reader_client)), 3)
+
+    def test_comments_to_deleted_posts_are_dropped(self):
+        post = Post.objects.create(author=self.author, text='Удалится')
+        self.comment('Останется')
+        self.comment('Пропадёт', post)
+        post.delete()
+        call_command('flush_comments', once=True, stdout=StringIO())
+        self.assertEqual(
+            list(Comment.objects.values_list('text', flat=True)),
+            ['Останется'],
+        )
+        self.assertEqual(os.listdir(TEMP_SPOOL_DIR), [CLAIMED_DIR])
+
+    def test_recover_returns_claimed_files(self):
+        self.comment('Потерянный')
+        self.assertEqual(len(claim(10)), 1)
+        self.assertEqual(flush(10), 0)
+        self.assertEqual(recover(), 1)
+        self.assertEqual(flush(10), 1)
+        self.assertTrue(Comment.objects.filter(text='Потерянный').exists())
+
+    def test_replayed_batch_keeps_dates_and_is_not_duplicated(self):
+        self.comment('Один раз')
+        [name] = os.listdir(TEMP_SPOOL_DIR)
+        with open(os.path.join(TEMP_SPOOL_DIR, name), encoding='utf-8') as f:
+            created = parse_datetime(json.load(f)['created'])
+        with mock.patch('posts.spool.os.remove', side_effect=OSError):
+            with self.assertRaises(OSError):
+                flush(10)
+        self.assertEqual(recover(), 1)
+        self.assertEqual(flush(10), 1)
+        comment = Comment.objects.get()
+        self.assertEqual(comment.created, created)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
@@ -0,0 +1,102 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..cache import author_feed, get_generation
+from ..models import Post, ThumbnailTask
+from ..thumbnails import claim_tasks, generate_thumbnails
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='thumb.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        cls.address = reverse('posts:post_detail', args=[cls.post.pk])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_new_image_is_queued(self):
+        self.assertTrue(
+            ThumbnailTask.objects.filter(image=self.post.image.name).exists()
+        )
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertEqual(ThumbnailTask.objects.count(), 1)
+
+    def test_template_does_not_generate_on_miss(self):
+        response = self.guest_client.get(self.address)
+        self.assertContains(response, self.post.image.url)
+        self.assertNotContains(response, 'cache/')
+
+    def test_claimed_task_is_leased(self):
+        self.assertEqual(claim_tasks(10), [self.post.image.name])
+        self.assertEqual(claim_tasks(10), [])
+        self.assertEqual(ThumbnailTask.objects.count(), 1)
+
+    @override_settings(THUMBNAIL_TASK_LEASE=-1)
+    def test_expired_lease_is_claimed_again(self):
+        self.assertEqual(claim_tasks(10), [self.post.image.name])
+        self.assertEqual(claim_tasks(10), [self.post.image.name])
+
+    @override_settings(THUMBNAIL_TASK_LEASE=-1, THUMBNAIL_MAX_ATTEMPTS=2)
+    def test_failing_task_is_parked(self):
+        name = self.post.image.name
+        with mock.patch(
+            'posts.thumbnails.ThumbnailBackend.get_thumbnail',
+            side_effect=OSError,
+        ):
+            for _ in range(2):
+                self.assertEqual(claim_tasks(10), [name])
+                with self.assertLogs('posts.thumbnails') as logs:
+                    self.assertFalse(generate_thumbnails(name))
+        self.assertIn('больше не готовятся', logs.output[-1])
+        self.assertEqual(claim_tasks(10), [])
+        self.assertEqual(ThumbnailTask.objects.get().attempts, 2)
+
+    def test_generated_task_leaves_queue(self):
+        claim_tasks(10)
+        feed = author_feed(self.user.pk)
+        generation = get_generation(feed)
+        self.assertTrue(generate_thumbnails(self.post.image.name))
+        self.assertFalse(ThumbnailTask.objects.exists())
+        self.assertNotEqual(get_generation(feed), generation)
+
+    def test_template_uses_prepared_thumbnail(self):
+        generate_thumbnails(self.post.image.name)
+        response = self.guest_client.get(self.address)
+        self.assertContains(response, f'{settings.MEDIA_URL}cache/')
+        self.assertNotContains(response, self.post.image.url)
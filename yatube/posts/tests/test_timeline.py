@@ -0,0 +1,151 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+from ..timeline import get_feed, is_pull_author
+from ..utilites import decode_cursor, get_cursor_page
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.follower = User.objects.create_user(username='follower')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Пост до подписки',
+        )
+
+    def setUp(self) -> None:
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def timeline_posts(self):
+        return list(
+            TimelineEntry.objects.filter(
+                user=self.follower
+            ).values_list('post_id', flat=True)
+        )
+
+    def test_follow_backfills_timeline(self):
+        self.follower_client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertEqual(self.timeline_posts(), [self.old_post.pk])
+
+    def test_new_post_is_pushed_to_followers(self):
+        Follow.objects.create(user=self.follower, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(
+            self.timeline_posts(), [new_post.pk, self.old_post.pk]
+        )
+
+    def test_unfollow_trims_timeline(self):
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.follower_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertEqual(self.timeline_posts(), [])
+
+    def test_follow_index_reads_timeline_only(self):
+        Follow.objects.create(user=self.follower, author=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.follower_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [self.old_post])
+        self.assertFalse(any(
+            'posts_follow' in query['sql'] and 'posts_post' in query['sql']
+            for query in queries
+        ))
+
+
+@override_settings(FEED_PULL_FOLLOWERS_THRESHOLD=2)
+class HybridFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        cls.author = User.objects.create_user(username='author')
+        cls.star = User.objects.create_user(username='star')
+        Follow.objects.create(user=cls.fan, author=cls.star)
+        Follow.objects.create(user=cls.reader, author=cls.star)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self) -> None:
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_popular_author_posts_are_not_pushed(self):
+        Post.objects.create(author=self.star, text='Пост звезды')
+        self.assertFalse(
+            TimelineEntry.objects.filter(author=self.star).exists()
+        )
+
+    def test_feed_merges_pushed_and_pulled_posts(self):
+        posts = [
+            Post.objects.create(author=author, text=f'Пост {i}')
+            for i, author in enumerate(
+                (self.author, self.star, self.author, self.star)
+            )
+        ]
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), posts[::-1])
+
+    @override_settings(FEED_PULL_AUTHORS_LIMIT=0)
+    def test_feed_pages_by_cursor(self):
+        posts = [
+            Post.objects.create(author=author, text=f'Пост {i}')
+            for i, author in enumerate(
+                (self.star, self.author, self.star)
+            )
+        ]
+        feed = get_feed(self.reader)
+        first_page = get_cursor_page(feed, page_size=2)
+        self.assertEqual(list(first_page), posts[:0:-1])
+        second_page = get_cursor_page(
+            feed, decode_cursor(first_page.next_cursor), page_size=2
+        )
+        self.assertEqual(list(second_page), posts[:1])
+
+    def test_unfollow_below_threshold_stays_cheap(self):
+        post = Post.objects.create(author=self.star, text='Пост звезды')
+        fan_client = Client()
+        fan_client.force_login(self.fan)
+        with CaptureQueriesContext(connection) as queries:
+            fan_client.get(
+                reverse('posts:profile_unfollow', args=[self.star.username])
+            )
+        self.assertFalse(any(
+            query['sql'].startswith('INSERT')
+            and 'posts_timelineentry' in query['sql']
+            for query in queries
+        ))
+        self.assertIn(post, list(get_feed(self.reader)[:10]))
+        call_command('push_timelines', batch_size=1, stdout=StringIO())
+        self.assertFalse(is_pull_author(self.star.pk))
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertIn(post, list(get_feed(self.reader)[:10]))
+        new_post = Post.objects.create(author=self.star, text='Новый пост')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=new_post
+        ).exists())
+
+    @override_settings(FEED_PUSH_FOLLOWERS_RATIO=0.5)
+    def test_author_leaves_pull_mode_below_lower_threshold(self):
+        Follow.objects.filter(user=self.fan, author=self.star).delete()
+        call_command('push_timelines', stdout=StringIO())
+        self.assertTrue(is_pull_author(self.star.pk))
+        Follow.objects.filter(user=self.reader, author=self.star).delete()
+        call_command('push_timelines', stdout=StringIO())
+        self.assertFalse(is_pull_author(self.star.pk))
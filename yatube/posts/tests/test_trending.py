@@ -0,0 +1,99 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Post, TrendingPost, TrendingRun
+from ..trending import add_log2, log_weight, refresh
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.quiet = Post.objects.create(author=cls.author, text='Тихий')
+        cls.hot = Post.objects.create(author=cls.author, text='Горячий')
+        cls.old = Post.objects.create(author=cls.author, text='Старый')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def comment(self, post, age=timedelta()):
+        comment = Comment.objects.create(
+            post=post, author=self.author, text='Комментарий'
+        )
+        Comment.objects.filter(pk=comment.pk).update(
+            created=timezone.now() - age
+        )
+        return comment
+
+    def ranking(self):
+        return list(TrendingPost.objects.order_by(
+            '-score'
+        ).values_list('post_id', flat=True))
+
+    def test_add_log2(self):
+        self.assertEqual(add_log2(None, 3.0), 3.0)
+        self.assertAlmostEqual(add_log2(3.0, 3.0), 4.0)
+        self.assertAlmostEqual(add_log2(2000.0, 0.0), 2000.0)
+
+    def test_recent_comments_weigh_more(self):
+        half_life = timedelta(seconds=settings.TRENDING_HALF_LIFE)
+        self.comment(self.hot)
+        self.comment(self.quiet, half_life * 2)
+        self.comment(self.quiet, half_life * 2)
+        self.comment(self.quiet, half_life * 2)
+        self.comment(self.old, half_life * 3)
+        self.assertEqual(refresh(), 5)
+        self.assertEqual(self.ranking(), [self.hot.pk, self.quiet.pk,
+                                          self.old.pk])
+
+    def test_refresh_is_incremental(self):
+        self.comment(self.quiet)
+        refresh()
+        score = TrendingPost.objects.get(post=self.quiet).score
+        self.assertEqual(refresh(), 0)
+        comment = self.comment(self.quiet)
+        self.assertEqual(refresh(), 1)
+        self.assertAlmostEqual(
+            TrendingPost.objects.get(post=self.quiet).score,
+            add_log2(score, log_weight(
+                Comment.objects.get(pk=comment.pk).created
+            )),
+        )
+        self.assertEqual(TrendingRun.objects.get().last_comment_id,
+                         comment.pk)
+
+    def test_stale_posts_drop_out(self):
+        self.comment(self.hot)
+        self.comment(self.old, timedelta(
+            seconds=settings.TRENDING_MAX_AGE + 60
+        ))
+        call_command('refresh_trending', stdout=StringIO())
+        self.assertEqual(self.ranking(), [self.hot.pk])
+
+    def test_popular_page(self):
+        self.comment(self.quiet)
+        self.comment(self.hot)
+        self.comment(self.hot)
+        refresh()
+        response = self.guest_client.get(reverse('posts:popular'))
+        self.assertTemplateUsed(response, 'posts/popular.html')
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [self.hot.pk, self.quiet.pk],
+        )
+        self.comment(self.old)
+        refresh()
+        response = self.guest_client.get(reverse('posts:popular'))
+        self.assertContains(response, 'Старый')
@@ -6,10 +6,13 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Group, Post
+from ..models import Comment, Follow, Group, Post
+from ..utilites import FeedPaginator, encode_cursor
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -221,6 +224,210 @@ class PaginatorViewsTest(TestCase):
                     self.count_posts_list_two
                 )
 
+    def test_offset_pages_use_feed_counters(self):
+        for address in self.reverse_contains_posts:
+            with self.subTest(adress=address):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client.get(address)
+                self.assertEqual(
+                    response.context['page_obj'].paginator.num_pages, 2
+                )
+                self.assertFalse(any(
+                    'COUNT(' in query['sql'] for query in queries
+                ))
+
+    def test_elided_page_range(self):
+        paginator = FeedPaginator(range(100), 5)
+        ellipsis = FeedPaginator.ELLIPSIS
+        self.assertEqual(
+            list(paginator.get_elided_page_range(10)),
+            [1, ellipsis, 8, 9, 10, 11, 12, ellipsis, 20],
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(2)),
+            [1, 2, 3, 4, ellipsis, 20],
+        )
+        self.assertEqual(
+            list(FeedPaginator(range(20), 5).get_elided_page_range(2)),
+            [1, 2, 3, 4],
+        )
+        response = self.authorized_client.get(
+            reverse('posts:index') + '?page=2'
+        )
+        self.assertContains(response, '?page=1')
+
+
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Текстовое описание',
+        )
+        for i in range(settings.PAGE_SIZE + settings.PAGE_SIZE // 2):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Тестовый пост {i}',
+                group=cls.group,
+            )
+        cls.posts = list(Post.objects.order_by('-pub_date', '-id'))
+        cls.reverse_contains_posts = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        )
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_cursor_pages_follow_keyset_order(self):
+        last_on_first_page = self.posts[settings.PAGE_SIZE - 1]
+        for address in self.reverse_contains_posts:
+            with self.subTest(address=address):
+                response = self.authorized_client.get(
+                    address, {'after': encode_cursor(last_on_first_page)}
+                )
+                page_obj = response.context['page_obj']
+                self.assertEqual(
+                    list(page_obj), self.posts[settings.PAGE_SIZE:]
+                )
+                self.assertFalse(page_obj.has_next())
+                self.assertTrue(page_obj.has_previous())
+
+                response = self.authorized_client.get(
+                    address, {'before': page_obj.previous_cursor}
+                )
+                self.assertEqual(
+                    list(response.context['page_obj']),
+                    self.posts[:settings.PAGE_SIZE],
+                )
+
+    @override_settings(PAGINATION_MODE='cursor')
+    def test_cursor_mode_skips_count(self):
+        for address in self.reverse_contains_posts:
+            with self.subTest(address=address):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client.get(address)
+                page_obj = response.context['page_obj']
+                self.assertEqual(len(page_obj), settings.PAGE_SIZE)
+                self.assertContains(
+                    response, f'?after={page_obj.next_cursor}'
+                )
+                self.assertFalse(any(
+                    'COUNT(' in query['sql'] for query in queries
+                ))
+
+
+class QueryBudgetViewsTest(TestCase):
+    """Число запросов на страницу ленты не растёт вместе с данными."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Текстовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.addresses = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+        )
+
+    def setUp(self) -> None:
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def create_posts(self, count):
+        for i in range(count):
+            Post.objects.create(
+                author=self.author,
+                text=f'Тестовый пост {i}',
+                group=self.group,
+            )
+
+    def count_queries(self, address):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.reader_client.get(address)
+        return len(queries)
+
+    def test_list_pages_query_budget(self):
+        self.create_posts(1)
+        budgets = {
+            address: self.count_queries(address)
+            for address in self.addresses
+        }
+        self.create_posts(settings.PAGE_SIZE * 2)
+        for address, budget in budgets.items():
+            with self.subTest(address=address):
+                self.assertEqual(self.count_queries(address), budget)
+
+
+@override_settings(COMMENTS_PAGE_SIZE=3)
+class CommentPaginationViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.reader, text='Пост')
+        for i in range(7):
+            commenter = User.objects.create_user(username=f'commenter{i}')
+            Comment.objects.create(
+                post=cls.post, author=commenter, text=f'Комментарий {i}'
+            )
+        cls.comments = list(cls.post.comments.order_by('-created', '-id'))
+        cls.detail_url = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.fragment_url = reverse('posts:post_comments', args=[cls.post.pk])
+
+    def setUp(self) -> None:
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_post_detail_shows_first_page(self):
+        response = self.reader_client.get(self.detail_url)
+        page = response.context['comments']
+        self.assertEqual(list(page), self.comments[:3])
+        self.assertTrue(page.has_next())
+        self.assertContains(
+            response, f'{self.fragment_url}?after={page.next_cursor}'
+        )
+
+    def test_fragment_loads_following_pages(self):
+        response = self.reader_client.get(self.detail_url)
+        cursor = response.context['comments'].next_cursor
+        response = self.reader_client.get(self.fragment_url, {'after': cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        page = response.context['comments']
+        self.assertEqual(list(page), self.comments[3:6])
+        response = self.reader_client.get(
+            self.fragment_url, {'after': page.next_cursor}
+        )
+        self.assertEqual(list(response.context['comments']), self.comments[6:])
+        self.assertNotContains(response, 'data-fragment-url')
+
+    def test_comment_authors_are_joined(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.reader_client.get(self.detail_url)
+        auth_user_queries = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "auth_user"' in query['sql']
+        ]
+        # Только загрузка пользователя сессии.
+        self.assertEqual(len(auth_user_queries), 1)
+
 
 class PostIntegrationViewsTests(TestCase):
     @classmethod
@@ -288,12 +495,18 @@ class PostCacheIndexViewTests(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Текстовое описание',
+        )
         cls.post_user = Post.objects.create(
             author=cls.user,
             text='Тестовый текст',
         )
 
     def setUp(self) -> None:
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -302,17 +515,56 @@ class PostCacheIndexViewTests(TestCase):
         response_post_exits = (
             self.guest_client.get(reverse('posts:index')).content
         )
-        self.post_user.delete()
-        response_post_deleted = (
+        Post.objects.filter(pk=self.post_user.pk).update(text='Новый текст')
+        response_post_updated = (
             self.guest_client.get(reverse('posts:index')).content
         )
-        self.assertEqual(response_post_exits, response_post_deleted)
+        self.assertEqual(response_post_exits, response_post_updated)
         cache.clear()
         response_cache_cleared = (
             self.guest_client.get(reverse('posts:index')).content
         )
         self.assertNotEqual(response_post_exits, response_cache_cleared)
 
+    def test_post_writes_invalidate_feed_caches(self):
+        addresses = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        )
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост для кэша',
+            group=self.group,
+        )
+        for address in addresses:
+            with self.subTest(address=address):
+                self.assertContains(
+                    self.guest_client.get(address), 'Пост для кэша'
+                )
+        post.delete()
+        for address in addresses:
+            with self.subTest(address=address):
+                self.assertNotContains(
+                    self.guest_client.get(address), 'Пост для кэша'
+                )
+
+    def test_group_change_invalidates_previous_group(self):
+        other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Текстовое описание',
+        )
+        self.post_user.group = self.group
+        self.post_user.save()
+        address = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.assertContains(self.guest_client.get(address), 'Тестовый текст')
+        self.post_user.group = other_group
+        self.post_user.save()
+        self.assertNotContains(
+            self.guest_client.get(address), 'Тестовый текст'
+        )
+
 
 class PostFollowViewTests(TestCase):
     @classmethod
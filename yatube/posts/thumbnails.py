@@ -0,0 +1,101 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.images import ImageFile
+
+from .cache import bump_generation, post_feeds
+from .models import Post, ThumbnailTask
+
+logger = logging.getLogger(__name__)
+
+
+def schedule(name):
+    """Ставит картинку в очередь воркера в той же транзакции, что и пост."""
+    ThumbnailTask.objects.bulk_create(
+        [ThumbnailTask(image=name)], ignore_conflicts=True
+    )
+
+
+def claim_tasks(limit):
+    """Берёт задачи из очереди в аренду на THUMBNAIL_TASK_LEASE.
+
+    Задачу удаляет generate_thumbnails после успеха; если воркер упал
+    или не справился, по истечении аренды её заберёт другой. Каждая
+    аренда считается попыткой: после THUMBNAIL_MAX_ATTEMPTS задача
+    остаётся в очереди, но воркеры её больше не берут, даже если
+    картинка роняет сам воркер.
+    """
+    now = timezone.now()
+    available = (
+        Q(leased_until__isnull=True) | Q(leased_until__lt=now)
+    ) & Q(attempts__lt=settings.THUMBNAIL_MAX_ATTEMPTS)
+    leased_until = now + timedelta(seconds=settings.THUMBNAIL_TASK_LEASE)
+    claimed = []
+    tasks = ThumbnailTask.objects.filter(available).order_by('pk')
+    for task in tasks[:limit]:
+        leased = ThumbnailTask.objects.filter(available, pk=task.pk).update(
+            leased_until=leased_until, attempts=F('attempts') + 1
+        )
+        if leased:
+            claimed.append(task.image)
+    return claimed
+
+
+def generate_thumbnails(name):
+    """Готовит все миниатюры POST_THUMBNAIL_GEOMETRIES для картинки.
+
+    После успеха задача уходит из очереди, а ленты с постами этой
+    картинки получают новое поколение кэша.
+    """
+    backend = ThumbnailBackend()
+    try:
+        if default.storage.exists(name):
+            for geometry, options in settings.POST_THUMBNAIL_GEOMETRIES:
+                backend.get_thumbnail(name, geometry, **options)
+    except Exception:
+        logger.exception('Не удалось подготовить миниатюры для %s', name)
+        parked = ThumbnailTask.objects.filter(
+            image=name, attempts__gte=settings.THUMBNAIL_MAX_ATTEMPTS
+        ).exists()
+        if parked:
+            logger.error('Миниатюры для %s больше не готовятся', name)
+        return False
+    ThumbnailTask.objects.filter(image=name).delete()
+    feeds = set()
+    for post in Post.objects.filter(image=name).only('author', 'group'):
+        feeds.update(post_feeds(post))
+    bump_generation(*feeds)
+    return True
+
+
+class NotPrepared(Exception):
+    """Миниатюры ещё нет: её подготовит воркер, а не запрос."""
+
+
+class PreparedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд для шаблонов: отдаёт только заранее готовые миниатюры.
+
+    На промахе тег {% thumbnail %} рендерит блок {% empty %}, а картинку
+    готовит воркер thumbnail_worker, а не поток запроса. Опции и имя
+    миниатюры считает сам sorl, поэтому они совпадают с теми, что
+    использовал воркер.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        try:
+            return super().get_thumbnail(file_, geometry_string, **options)
+        except NotPrepared:
+            return None
+
+    def _get_thumbnail_filename(self, source, geometry_string, options):
+        name = super()._get_thumbnail_filename(
+            source, geometry_string, options
+        )
+        if not default.kvstore.get(ImageFile(name, default.storage)):
+            raise NotPrepared(name)
+        return name
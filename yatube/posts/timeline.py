@@ -0,0 +1,267 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .utilites import CURSOR_KEYS, get_page, seek
+
+TIMELINE_KEYS = ('pub_date', 'post_id')
+
+
+def _write_entries(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, settings.TIMELINE_BATCH_SIZE))
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def is_pull_author(author_id):
+    """Посты авторов с огромной аудиторией не раскладываются по лентам."""
+    return UserStats.objects.filter(
+        user_id=author_id, pull_mode=True
+    ).exists()
+
+
+def enter_pull_mode(*author_ids):
+    """Переводит авторов, набравших порог подписчиков, в чтение при запросе.
+
+    Без author_ids проверяются все авторы.
+    """
+    stats = UserStats.objects.filter(
+        pull_mode=False,
+        followers_count__gte=settings.FEED_PULL_FOLLOWERS_THRESHOLD,
+    )
+    if author_ids:
+        stats = stats.filter(user_id__in=author_ids)
+    return stats.update(pull_mode=True)
+
+
+def leaving_authors():
+    """Авторы в чтении при запросе, чьих подписчиков меньше порога выхода."""
+    threshold = (
+        settings.FEED_PULL_FOLLOWERS_THRESHOLD
+        * settings.FEED_PUSH_FOLLOWERS_RATIO
+    )
+    return UserStats.objects.filter(
+        pull_mode=True, followers_count__lt=threshold
+    ).values_list('user_id', flat=True)
+
+
+def pull_authors(user):
+    """Авторы из подписок пользователя, чьи посты читаются при запросе."""
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__stats__pull_mode=True,
+        ).order_by('-id').values_list('author_id', flat=True)
+    )
+
+
+def push_post(post):
+    """Раскладывает новый пост по лентам всех подписчиков автора."""
+    if is_pull_author(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _write_entries(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    if is_pull_author(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date')
+    _write_entries(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def _insert_select(where, params):
+    quote = connection.ops.quote_name
+    entry, follow, post = TimelineEntry._meta, Follow._meta, Post._meta
+    sql = (
+        f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+        f'{quote(entry.db_table)} '
+        f'(user_id, post_id, author_id, pub_date) '
+        f'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+        f'FROM {quote(follow.db_table)} f '
+        f'JOIN {quote(post.db_table)} p ON p.author_id = f.author_id '
+        f'WHERE {where} '
+        f'{connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def fill(post_start, follow_start=0, skip_authors=()):
+    """Раскладывает посты с id >= post_start одним INSERT ... SELECT.
+
+    Для массовой загрузки: записей в лентах на порядок больше, чем
+    постов, и вставлять их через модели слишком долго. Учитываются
+    подписки с id >= follow_start, посты skip_authors не раскладываются.
+    """
+    where = 'f.id >= %s AND p.id >= %s'
+    params = [follow_start, post_start]
+    if skip_authors:
+        where += ' AND f.author_id NOT IN ({})'.format(
+            ', '.join(['%s'] * len(skip_authors))
+        )
+        params.extend(skip_authors)
+    return _insert_select(where, params)
+
+
+def leave_pull_mode(author_id, batch_size):
+    """Раскладывает посты автора по лентам и возвращает его в раскладку.
+
+    Пока автор читался при запросе, его посты и подписки на него в ленты
+    не попадали. Они дописываются пачками по batch_size подписчиков,
+    и лишь затем автор выходит из режима: до этого его посты читаются
+    при запросе, и из лент ничего не пропадает. Последний проход
+    дописывает посты и подписки, появившиеся за время раскладки.
+    """
+    last_post = Post.objects.filter(author_id=author_id).aggregate(
+        top=Max('pk')
+    )['top'] or 0
+    last_follow, written = 0, 0
+    follows = Follow.objects.filter(author_id=author_id).order_by('pk')
+    while True:
+        batch = list(follows.filter(pk__gt=last_follow).values_list(
+            'pk', flat=True
+        )[:batch_size])
+        if not batch:
+            break
+        written += _insert_select(
+            'f.author_id = %s AND f.id > %s AND f.id <= %s AND p.id <= %s',
+            [author_id, last_follow, batch[-1], last_post],
+        )
+        last_follow = batch[-1]
+    with transaction.atomic():
+        UserStats.objects.filter(user_id=author_id).update(pull_mode=False)
+        written += _insert_select(
+            'f.author_id = %s AND (f.id > %s OR p.id > %s)',
+            [author_id, last_follow, last_post],
+        )
+    return written
+
+
+def trim(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).delete()
+
+
+def _as_post(row):
+    if isinstance(row, TimelineEntry):
+        return row.post
+    return row
+
+
+def _post_key(post):
+    return post.pub_date, post.pk
+
+
+class MergedFeed:
+    """Лента, слитая из нескольких отсортированных по (pub_date, id) потоков.
+
+    Каждый поток — queryset записей ленты или постов одного автора вместе
+    с ключом курсора. Срез читает из каждого потока не больше stop строк
+    и сливает их k-путевым слиянием.
+    """
+
+    def __init__(self, streams, reverse=False):
+        self.reverse = reverse
+        self.streams = [
+            (seek(queryset, None, keys, reverse), keys)
+            for queryset, keys in streams
+        ]
+
+    def seek(self, cursor, reverse=False):
+        return MergedFeed(
+            [
+                (seek(queryset, cursor, keys, reverse), keys)
+                for queryset, keys in self.streams
+            ],
+            reverse,
+        )
+
+    def count(self):
+        return sum(queryset.count() for queryset, _ in self.streams)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop = index.start or 0, index.stop
+        else:
+            start, stop = index, index + 1
+        if len(self.streams) == 1:
+            queryset, _ = self.streams[0]
+            rows = [_as_post(row) for row in queryset[start:stop]]
+        else:
+            merged = heapq.merge(
+                *(map(_as_post, queryset[:stop])
+                  for queryset, _ in self.streams),
+                key=_post_key,
+                reverse=not self.reverse,
+            )
+            rows = list(islice(merged, start, stop))
+        if isinstance(index, slice):
+            return rows
+        if not rows:
+            raise IndexError(index)
+        return rows[0]
+
+
+def get_feed(user):
+    """Собирает ленту подписок: разложенные записи плюс читаемые авторы.
+
+    Первые FEED_PULL_AUTHORS_LIMIT авторов сливаются отдельными потоками,
+    остальные читаются одним общим запросом, чтобы число потоков
+    не зависело от числа подписок.
+    """
+    pulled = pull_authors(user)
+    limit = settings.FEED_PULL_AUTHORS_LIMIT
+    streams = [(
+        TimelineEntry.objects.filter(user=user).exclude(
+            author_id__in=pulled
+        ).select_related('post__author', 'post__group'),
+        TIMELINE_KEYS,
+    )]
+    streams += [
+        (Post.objects.for_feed().filter(author_id=author_id), CURSOR_KEYS)
+        for author_id in pulled[:limit]
+    ]
+    if pulled[limit:]:
+        streams.append(
+            (
+                Post.objects.for_feed().filter(author_id__in=pulled[limit:]),
+                CURSOR_KEYS,
+            )
+        )
+    return MergedFeed(streams)
+
+
+def get_timeline_page(request, user):
+    return get_page(request, get_feed(user))
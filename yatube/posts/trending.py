@@ -0,0 +1,80 @@
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache
+from .models import Comment, Post, TrendingPost, TrendingRun
+
+# Точка отсчёта весов: вес комментария — 2 ** ((created - EPOCH) / период).
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def log_weight(moment):
+    """log2 веса события, случившегося в moment."""
+    return (moment - EPOCH).total_seconds() / settings.TRENDING_HALF_LIFE
+
+
+def add_log2(first, second):
+    """log2(2 ** first + 2 ** second) без переполнения."""
+    if first is None:
+        return second
+    high, low = max(first, second), min(first, second)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def refresh(batch_size=5000):
+    """Добавляет в рейтинг комментарии, появившиеся после прошлого запуска.
+
+    Комментарии читаются по возрастанию id от сохранённой позиции, поэтому
+    каждый учитывается один раз, а стоимость запуска зависит только
+    от числа новых. Посты, чья оценка меньше веса одного комментария
+    давностью TRENDING_MAX_AGE, выпадают из рейтинга.
+    Возвращает число учтённых комментариев.
+    """
+    with transaction.atomic():
+        run, _ = TrendingRun.objects.select_for_update().get_or_create(pk=1)
+        scores = {}
+        processed = 0
+        last_id = run.last_comment_id
+        comments = Comment.objects.filter(pk__gt=last_id).order_by(
+            'pk'
+        ).values_list('pk', 'post_id', 'created')
+        for last_id, post_id, created in comments.iterator(batch_size):
+            scores[post_id] = add_log2(
+                scores.get(post_id), log_weight(created)
+            )
+            processed += 1
+        existing = TrendingPost.objects.in_bulk(list(scores))
+        changed, missing = [], []
+        for post_id, score in scores.items():
+            trending = existing.get(post_id)
+            if trending is None:
+                missing.append(TrendingPost(post_id=post_id, score=score))
+            else:
+                trending.score = add_log2(trending.score, score)
+                changed.append(trending)
+        TrendingPost.objects.bulk_update(changed, ['score'], batch_size)
+        TrendingPost.objects.bulk_create(missing, batch_size)
+        now = timezone.now()
+        TrendingPost.objects.filter(score__lt=log_weight(
+            now - timedelta(seconds=settings.TRENDING_MAX_AGE)
+        )).delete()
+        run.last_comment_id = last_id
+        run.finished = now
+        run.save()
+    cache.bump_generation(cache.trending_feed())
+    return processed
+
+
+def trending_posts():
+    """Посты рейтинга от самых популярных, с автором и группой.
+
+    Порядок целиком по столбцам TrendingPost, чтобы его давал индекс
+    trending_score_idx без сортировки во временном дереве.
+    """
+    return Post.objects.for_feed().filter(
+        trending__isnull=False
+    ).order_by('-trending__score', '-trending')
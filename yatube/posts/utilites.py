@@ -1,8 +1,220 @@
+from collections.abc import Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+CURSOR_KEYS = ('pub_date', 'id')
+COMMENT_KEYS = ('created', 'id')
+
+_explicit_dates = ContextVar('explicit_dates', default=frozenset())
+
+
+class AutoNowAdd:
+    """auto_now_add поля, который explicit_dates() выключает в своём потоке.
+
+    Поле модели одно на процесс, поэтому флаг на нём не меняется:
+    значение читается из ContextVar, и другие потоки видят его истинным.
+    """
+
+    def __init__(self, field):
+        self.field = field
+
+    def __bool__(self):
+        return self.field not in _explicit_dates.get()
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now_add в текущем потоке: bulk_create сохранит даты."""
+    for field in fields:
+        if not isinstance(field.auto_now_add, AutoNowAdd):
+            field.auto_now_add = AutoNowAdd(field)
+    token = _explicit_dates.set(_explicit_dates.get() | set(fields))
+    try:
+        yield
+    finally:
+        _explicit_dates.reset(token)
+
+
+class CursorPage(Sequence):
+    """Страница ленты без OFFSET и COUNT(*): ссылки строятся по курсорам."""
+
+    def __init__(self, object_list, cursor='',
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage {self.cursor or "first"}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class FeedPaginator(Paginator):
+    """Paginator с заранее известным числом записей и окном номеров страниц.
+
+    count — число или функция без аргументов, например чтение счётчика
+    ленты; без него записи считаются COUNT(*), как обычно.
+    """
+
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        if self._count is None:
+            return Paginator.count.func(self)
+        if callable(self._count):
+            return self._count()
+        return self._count
+
+    def get_elided_page_range(self, number=1, on_each_side=2, on_ends=1):
+        """Номера страниц вокруг текущей и по краям, пропуски — ELLIPSIS."""
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(
+                self.num_pages - on_ends + 1, self.num_pages + 1
+            )
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+def _row_value(row, field):
+    if isinstance(row, dict):
+        return row[field]
+    return getattr(row, field)
+
+
+def encode_cursor(row, keys=CURSOR_KEYS):
+    field, id_field = keys
+    value = _row_value(row, field).isoformat()
+    pk = _row_value(row, id_field)
+    return urlsafe_base64_encode(force_bytes(f'{value}|{pk}'))
+
+
+def decode_cursor(token):
+    """Возвращает пару (значение поля, pk) или None для битого курсора."""
+    if not token:
+        return None
+    try:
+        value, pk = urlsafe_base64_decode(token).decode().rsplit('|', 1)
+        value, pk = parse_datetime(value), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if value is None:
+        return None
+    return value, pk
+
+
+def seek(queryset, cursor, keys=CURSOR_KEYS, reverse=False):
+    """Переходит к позиции курсора по ключу keys без OFFSET.
+
+    По умолчанию лента идёт от новых записей к старым, reverse=True
+    разворачивает порядок для перехода на предыдущую страницу.
+    Составные ленты (MergedFeed) перематывают свои потоки сами.
+    """
+    if hasattr(queryset, 'seek'):
+        return queryset.seek(cursor, reverse)
+    field, id_field = keys
+    if reverse:
+        ordering = (field, id_field)
+        lookup = 'gt'
+    else:
+        ordering = (f'-{field}', f'-{id_field}')
+        lookup = 'lt'
+    if cursor is not None:
+        value, pk = cursor
+        queryset = queryset.filter(
+            Q(**{f'{field}__{lookup}': value})
+            | Q(**{field: value, f'{id_field}__{lookup}': pk})
+        )
+    return queryset.order_by(*ordering)
+
+
+def get_cursor_page(queryset, after=None, before=None,
+                    page_size=settings.PAGE_SIZE, keys=CURSOR_KEYS):
+    if before is not None:
+        rows = list(seek(queryset, before, keys, reverse=True)[
+            :page_size + 1
+        ])
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_next = True
+        cursor = 'before:{}:{}'.format(*before)
+    else:
+        rows = list(seek(queryset, after, keys)[:page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = after is not None
+        cursor = 'after:{}:{}'.format(*after) if has_previous else ''
+    return CursorPage(
+        rows,
+        cursor=cursor,
+        next_cursor=(
+            encode_cursor(rows[-1], keys) if has_next and rows else None
+        ),
+        previous_cursor=(
+            encode_cursor(rows[0], keys) if has_previous and rows else None
+        ),
+    )
+
 
+def get_page(request, queryset, page_size=settings.PAGE_SIZE,
+             cursor_keys=CURSOR_KEYS, count=None):
+    """Страница ленты по номеру или по курсору.
 
-def get_page(request, queryset, page_size=settings.PAGE_SIZE):
-    paginator = Paginator(queryset, page_size)
+    cursor_keys=None отключает курсоры для выборок без ключа сортировки,
+    например для результатов поиска, упорядоченных по релевантности.
+    count передаётся в FeedPaginator, курсорный режим его не использует.
+    """
+    if cursor_keys is None:
+        return FeedPaginator(queryset, page_size, count).get_page(
+            request.GET.get('page')
+        )
+    after = decode_cursor(request.GET.get('after'))
+    before = decode_cursor(request.GET.get('before'))
+    if (settings.PAGINATION_MODE == 'cursor'
+            or after is not None or before is not None):
+        return get_cursor_page(
+            queryset, after, before, page_size, cursor_keys
+        )
+    paginator = FeedPaginator(queryset, page_size, count)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
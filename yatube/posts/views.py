@@ -1,53 +1,107 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.ratelimit import ratelimit
+
+from .cache import (author_feed, get_generation, group_feed,
+                    index_feed, trending_feed)
+from .counters import get_feed_count, get_stats
+from .follows import follow, is_following, unfollow
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utilites import get_page
+from .models import Group, Post, User
+from .search import SearchResults
+from .spool import enqueue, pending_comments
+from .timeline import get_timeline_page
+from .trending import trending_posts
+from .utilites import (COMMENT_KEYS, decode_cursor, get_cursor_page,
+                       get_page)
 
 
 def index(request):
-    posts = Post.objects.all()
-    page_obj = get_page(request, posts)
-    return render(
-        request, 'posts/index.html', {'page_obj': page_obj},
+    posts = Post.objects.for_feed()
+    page_obj = get_page(
+        request, posts, count=lambda: get_feed_count(index_feed())
     )
+    context = {
+        'page_obj': page_obj,
+        'cache_generation': get_generation(index_feed()),
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+    return render(request, 'posts/index.html', context)
+
+
+def popular(request):
+    page_obj = get_page(request, trending_posts(), cursor_keys=None)
+    context = {
+        'page_obj': page_obj,
+        'cache_generation': get_generation(trending_feed()),
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+    return render(request, 'posts/popular.html', context)
 
 
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = get_page(request, posts)
-    return render(
-        request, 'posts/group_list.html',
-        {'group': group, 'page_obj': page_obj},
+    posts = group.posts.for_feed()
+    page_obj = get_page(
+        request, posts, count=lambda: get_feed_count(group_feed(group.pk))
     )
+    context = {
+        'group': group,
+        'page_obj': page_obj,
+        'cache_generation': get_generation(group_feed(group.pk)),
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+    return render(request, 'posts/group_list.html', context)
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = get_page(request, posts)
-    following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(user=request.user, author=author).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
     )
+    stats = get_stats(author)
+    posts = author.posts.for_feed()
+    page_obj = get_page(request, posts, count=stats.posts_count)
+    following = bool(is_following(request.user, [author]))
     context = {
         'author': author,
         'page_obj': page_obj,
         'following': following,
+        'cache_generation': get_generation(author_feed(author.pk)),
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def get_comments_page(request, post):
+    comments = post.comments.select_related('author')
+    after = decode_cursor(request.GET.get('after'))
+    page = get_cursor_page(
+        comments,
+        after=after,
+        page_size=settings.COMMENTS_PAGE_SIZE,
+        keys=COMMENT_KEYS,
+    )
+    if after is None and settings.COMMENT_WRITE_BEHIND:
+        page.object_list = [
+            *pending_comments(post, request.user), *page.object_list
+        ]
+    return page
+
+
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    author = get_object_or_404(User, username=post.author)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    get_stats(post.author)
+    comments = None
+    if request.user.is_authenticated:
+        comments = get_comments_page(request, post)
     form = CommentForm()
     context = {
         'post': post,
-        'author': author,
+        'author': post.author,
         'comments': comments,
         'form': form,
     }
@@ -55,6 +109,17 @@ def post_detail(request, post_id):
 
 
 @login_required
+def post_comments(request, post_id):
+    post = get_object_or_404(Post, pk=post_id)
+    context = {
+        'post': post,
+        'comments': get_comments_page(request, post),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+@login_required
+@ratelimit('post_create')
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if not form.is_valid():
@@ -81,26 +146,40 @@ def post_edit(request, post_id):
             request, 'posts/create_and_edit_post.html',
             {'form': form, 'post': post, 'is_edit': True},
         )
-    form.save()
+    form.save(commit=False)
+    post.save(update_fields=PostForm.Meta.fields)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@ratelimit('add_comment')
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
-        comment = form.save(commit=False)
-        comment.author = request.user
-        comment.post = post
-        comment.save()
+        if settings.COMMENT_WRITE_BEHIND:
+            enqueue(post, request.user, form.cleaned_data['text'])
+        else:
+            comment = form.save(commit=False)
+            comment.author = request.user
+            comment.post = post
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = get_page(request, SearchResults(query), cursor_keys=None)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_page(request, post_list)
+    page_obj = get_timeline_page(request, request.user)
     context = {
         'page_obj': page_obj,
     }
@@ -108,17 +187,15 @@ def follow_index(request):
 
 
 @login_required
+@ratelimit('profile_follow', methods=('GET', 'POST'))
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    user = request.user
-    if author != user and not (Follow.objects.filter(
-            user=request.user, author=author).exists()):
-        Follow.objects.get_or_create(user=user, author=author)
+    follow(request.user, author)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
+    unfollow(request.user, author)
     return redirect('posts:profile', username=username)
@@ -1,4 +1,8 @@
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -18,6 +22,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -37,6 +42,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Замеры запросов включаются добавлением в начало MIDDLEWARE
+# 'core.middleware.ServerTimingMiddleware'. Замеряется доля запросов.
+SERVER_TIMING_SAMPLE_RATE = 0.01
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIRS = os.path.join(BASE_DIR, 'templates')
@@ -110,14 +119,124 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATCH = os.path.join(BASE_DIR, 'sent_emails')
 
 PAGE_SIZE = 10
+COMMENTS_PAGE_SIZE = 20
+# 'offset' — нумерованные страницы, 'cursor' — переход по курсорам
+# (pub_date, id) без COUNT(*). Параметры ?after= и ?before= включают
+# курсорный режим независимо от настройки.
+PAGINATION_MODE = 'offset'
+
+# Размер пачки при раскладке постов по лентам подписчиков.
+TIMELINE_BATCH_SIZE = 500
+# Посты авторов, у которых подписчиков не меньше порога, не раскладываются
+# по лентам, а читаются и сливаются с лентой при запросе.
+FEED_PULL_FOLLOWERS_THRESHOLD = 10000
+# Обратно в раскладку автор возвращается, только когда подписчиков стало
+# меньше этой доли порога, и не в запросе, а командой push_timelines.
+FEED_PUSH_FOLLOWERS_RATIO = 0.9
+# Сколько таких авторов сливается отдельными потоками на одного читателя.
+FEED_PULL_AUTHORS_LIMIT = 20
+# Множества подписок пользователей сбрасываются при подписке и отписке.
+FOLLOWING_CACHE_TIMEOUT = 60 * 60 * 24
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки крупнее порога пишутся во временный файл, а не держатся в памяти.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+POST_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50 * 10 ** 6
+POST_IMAGE_MAX_EDGE = 1920
+
+SEARCH_MAX_RESULTS = 1000
+
+# Отложенная запись комментариев: форма кладёт их в очередь на диске,
+# а `manage.py flush_comments` пишет в базу пачками. Пока комментарий
+# в очереди, его автор видит его из кэша. Оверлей правится под блокировкой,
+# поэтому ему нужен общий кэш без локального L1.
+COMMENT_WRITE_BEHIND = False
+COMMENT_SPOOL_DIR = os.path.join(BASE_DIR, 'spool', 'comments')
+COMMENT_FLUSH_BATCH = 500
+COMMENT_PENDING_TIMEOUT = 60 * 10
+COMMENT_PENDING_CACHE = 'shared'
+
+# Фрагменты лент сбрасываются сменой поколения при записи постов,
+# поэтому срок жизни может быть долгим.
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+# Сколько последних постов отдают ленты RSS и Atom.
+SYNDICATION_ITEMS = 20
+
+# Шард карты сайта — диапазон id, не больше 50 000 адресов по протоколу.
+# `manage.py generate_sitemaps` заранее сохраняет шарды в SITEMAP_ROOT.
+SITEMAP_SHARD_SIZE = 50000
+SITEMAP_CACHE_TIMEOUT = 60 * 60
+SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+
+# Рейтинг популярных постов пересчитывает `manage.py refresh_trending`
+# по расписанию. Вес комментария удваивается каждые TRENDING_HALF_LIFE
+# секунд, посты без свежих комментариев за TRENDING_MAX_AGE выпадают.
+TRENDING_HALF_LIFE = 60 * 60 * 12
+TRENDING_MAX_AGE = 60 * 60 * 24 * 7
+
+# Миниатюры готовит пул потоков `manage.py thumbnail_worker` по очереди,
+# которая пополняется при сохранении поста. Шаблоны только читают готовые
+# миниатюры и никогда не генерируют картинки в запросе.
+THUMBNAIL_BACKEND = 'posts.thumbnails.PreparedThumbnailBackend'
+THUMBNAIL_WORKERS = 2
+# Задача, которую воркер не закрыл за это время, снова попадает в очередь.
+THUMBNAIL_TASK_LEASE = 60 * 5
+# После стольких попыток задача остаётся в очереди, но её не берут.
+THUMBNAIL_MAX_ATTEMPTS = 5
+POST_THUMBNAIL_GEOMETRIES = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+
+# Файловые кэши живут между запусками. У тестов свой каталог на каждый
+# прогон, чтобы не делить кэш с dev-сервером и предыдущими прогонами.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+if TESTING:
+    CACHE_ROOT = tempfile.mkdtemp(prefix='yatube-tests-')
+    atexit.register(shutil.rmtree, CACHE_ROOT, True)
+else:
+    CACHE_ROOT = tempfile.gettempdir()
+
+# Общий для всех воркеров L2: файловый кэш как замена memcached, который
+# подключается сюда же без изменений в коде. Над ним двухуровневый кэш
+# с локальным L1, блокировкой пересчёта и ранним обновлением ключей.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'L1_TIMEOUT': 1,
+            'STALE_TIMEOUT': 60,
+            'LOCK_TIMEOUT': 10,
+            # Новое поколение ленты — это новые ключи фрагментов: на промахе
+            # фрагмент рендерит один читатель, остальные ждут его.
+            'LOCK_ON_MISS': ['template.cache.'],
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.LockingFileBasedCache',
+        'LOCATION': os.path.join(CACHE_ROOT, 'yatube-cache'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    # Корзины лимитов читаются и пишутся под блокировкой, поэтому
+    # им нужен общий кэш без локального L1.
+    'ratelimit': {
+        'BACKEND': 'core.cache.LockingFileBasedCache',
+        'LOCATION': os.path.join(CACHE_ROOT, 'yatube-ratelimit'),
+    },
+}
+
+# Лимиты записи: 'число/период' (s, m, h, d) задаёт ёмкость корзины
+# маркеров и время её полного пополнения, отдельно на пользователя и на IP.
+RATELIMIT_ENABLED = True
+RATELIMIT_CACHE = 'ratelimit'
+RATELIMITS = {
+    'post_create': {'user': '10/m', 'ip': '30/m'},
+    'add_comment': {'user': '20/m', 'ip': '60/m'},
+    'profile_follow': {'user': '30/m', 'ip': '60/m'},
+    'signup': {'ip': '10/h'},
 }